@@ -1,15 +1,19 @@
-from pages.utils.plotly_figure import interactive_plot, normalize, daily_return, calculate_beta
+from pages.utils.plotly_figure import interactive_plot
+from pages.utils.capm_engine import capm_regression, rolling_capm
+from pages.utils.return_engine import normalize, daily_return
+from pages.utils.market_data import fetch_capm_data
+from pages.utils.series_align import align_series
 import streamlit as st
 import datetime
 import pandas as pd
-import yfinance as yf
-import pandas_datareader.data as web
 import plotly.express as px
+from pages.utils.instrumentation import begin_run, finish_run
 
 # --- Page Configuration ---
 st.set_page_config(page_title='CAPM - Beta & Return',
                    page_icon='chart_with_upwards_trend',
                    layout='wide')
+begin_run()
 
 # --- App Title (Updated to match image) ---
 st.title('Calculate Beta and Return for Individual Stock')
@@ -28,26 +32,18 @@ try:
     end = datetime.date.today()
     start = datetime.date(datetime.date.today().year - year, datetime.date.today().month, datetime.date.today().day)
     
-    SP500 = web.DataReader(['sp500'], 'fred', start, end)
-    
-    stocks_df = pd.DataFrame()
-
-    data = yf.download(selected_stock, period=f'{year}y')
-    stocks_df[f'{selected_stock}'] = data['Close']
+    # FRED and the stock are fetched concurrently
+    stocks_df, SP500 = fetch_capm_data([selected_stock], start, end)
 
     # --- Data Processing ---
-    stocks_df.reset_index(inplace=True)
-    SP500.reset_index(inplace=True)
-    SP500.columns = ['Date', 'sp500']
-    stocks_df['Date'] = stocks_df['Date'].astype('datetime64[ns]')
-    stocks_df['Date'] = stocks_df['Date'].apply(lambda x: str(x)[:10])
-    stocks_df['Date'] = pd.to_datetime(stocks_df['Date'])
-    stocks_df = pd.merge(stocks_df, SP500, on='Date', how='inner')
+    # Keep the dates both the stock and FRED have a value for (FRED holidays are dropped)
+    stocks_df = align_series(stocks_df, SP500, calendar='intersection', fill_policy='drop').reset_index()
 
     stocks_daily_return = daily_return(stocks_df)
 
     # --- Beta & Return Calculation ---
-    beta, alpha = calculate_beta(stocks_daily_return, selected_stock)
+    capm_df = capm_regression(stocks_daily_return[[selected_stock]], stocks_daily_return['sp500'])
+    beta, alpha = capm_df.loc[selected_stock, 'Beta'], capm_df.loc[selected_stock, 'Alpha']
     
     # Calculate historical annualized return for the stock
     historical_return = stocks_daily_return[selected_stock].mean() * 252
@@ -82,5 +78,25 @@ try:
     )
     st.plotly_chart(fig, use_container_width=True)
 
+    # --- Rolling Beta / Correlation / Volatility ---
+    st.markdown("### Rolling Statistics")
+    rolling_metric = st.selectbox('Rolling statistic', ('Beta', 'Correlation', 'Volatility'))
+    rolling_windows = (60, 252)
+    stock_returns = stocks_daily_return.set_index('Date')[[selected_stock]]
+    rolling_df = pd.DataFrame(index=stock_returns.index)
+    for window in rolling_windows:
+        rolling_stats = rolling_capm(stock_returns, stocks_daily_return['sp500'], window)
+        rolling_df[f'{window}-day'] = rolling_stats[rolling_metric][selected_stock]
+
+    rolling_fig = px.line(
+        rolling_df,
+        labels={'value': f'Rolling {rolling_metric}', 'variable': 'Window'},
+        title=f'{selected_stock} Rolling {rolling_metric} vs S&P 500'
+    )
+    rolling_fig.update_layout(title_x=0.05)
+    st.plotly_chart(rolling_fig, use_container_width=True)
+
 except Exception as e:
-    st.error(f"An error occurred. Please check your inputs. Error: {e}")
\ No newline at end of file
+    st.error(f"An error occurred. Please check your inputs. Error: {e}")
+
+finish_run()
\ No newline at end of file
@@ -1,40 +1,37 @@
-from pages.utils.plotly_figure import interactive_plot,normalize,daily_return,calculate_beta
+from pages.utils.plotly_figure import interactive_plot
+from pages.utils.capm_engine import capm_regression
+from pages.utils.return_engine import normalize,daily_return
+from pages.utils.market_data import fetch_capm_data
+from pages.utils.series_align import align_series
 
 import streamlit as st
 import datetime
 import pandas as pd
-import yfinance as yf
-import pandas_datareader.data as web
+from pages.utils.instrumentation import begin_run, finish_run
 
 st.set_page_config(page_title='CAPM',
     page_icon='chart_with_upwards_trend',
     layout='wide')
+begin_run()
 
 st.title('Capital Asset Pricing Model')
 
 col1,col2=st.columns([1,1])
 with col1:
-    stocks_list=st.multiselect('Choose 4 stocks', ('TSLA','AAPL','NFLX','MSFT','MGM','AMZN','NVDA','GOOGL'),['TSLA','AAPL','AMZN','GOOGL'])
+    stocks_list=st.multiselect('Choose stocks', ('TSLA','AAPL','NFLX','MSFT','MGM','AMZN','NVDA','GOOGL',
+        'META','BRK-B','JPM','V','MA','UNH','JNJ','PG','XOM','CVX','HD','KO','PEP','COST','WMT','DIS',
+        'ADBE','CRM','ORCL','INTC','AMD','CSCO','BAC','PFE'),['TSLA','AAPL','AMZN','GOOGL'])
 with col2:
     year=st.number_input('Number of years',1,10)
 
 try:
     end=datetime.date.today()
     start=datetime.date(datetime.date.today().year-year,datetime.date.today().month,datetime.date.today().day)
-    SP500=web.DataReader(['sp500'],'fred',start,end)
-    stocks_df=pd.DataFrame()
+    # FRED and every stock are fetched concurrently
+    stocks_df,SP500=fetch_capm_data(stocks_list,start,end)
 
-    for stock in stocks_list:
-        data=yf.download(stock,period=f'{year}y')
-        stocks_df[f'{stock}']=data['Close']
-
-    stocks_df.reset_index(inplace=True)
-    SP500.reset_index(inplace=True)
-    SP500.columns=['Date','sp500']
-    stocks_df['Date']=stocks_df['Date'].astype('datetime64[ns]')
-    stocks_df['Date']=stocks_df['Date'].apply(lambda x:str(x)[:10])
-    stocks_df['Date']=pd.to_datetime(stocks_df['Date'])
-    stocks_df=pd.merge(stocks_df,SP500,on='Date',how='inner')
+    # Keep the dates every stock and FRED have a value for (FRED holidays are dropped)
+    stocks_df=align_series(stocks_df,SP500,calendar='intersection',fill_policy='drop').reset_index()
 
     col1,col2=st.columns([1,1])
     with col1:
@@ -55,35 +52,29 @@ try:
     stocks_daily_return=daily_return(stocks_df)
     print(stocks_daily_return.head())
 
-    beta={}
-    alpha={}
-
-    for i in stocks_daily_return.columns:
-        if i !='Date' and i !='sp500':
-            b,a=calculate_beta(stocks_daily_return,i)
-            beta[i]=b
-            alpha[i]=a
-    print(beta,alpha)
+    # Beta, alpha, R squared and CAPM return for every stock in one vectorized regression
+    rf=0
+    stock_columns=[i for i in stocks_daily_return.columns if i !='Date' and i !='sp500']
+    capm_df=capm_regression(stocks_daily_return[stock_columns],stocks_daily_return['sp500'],rf=rf)
 
     beta_df=pd.DataFrame(columns=['Stock','Beta Value'])
-    beta_df['Stock']=beta.keys()
-    beta_df['Beta Value']=[str(round(i,2)) for i in beta.values()]
+    beta_df['Stock']=capm_df.index
+    beta_df['Beta Value']=[str(round(i,2)) for i in capm_df['Beta']]
+    beta_df['Alpha']=[str(round(i,2)) for i in capm_df['Alpha']]
+    beta_df['R Squared']=[str(round(i,2)) for i in capm_df['R Squared']]
 
     with col1:
         st.markdown("### Calculated Beta Value")
         st.dataframe(beta_df,use_container_width=True)
 
-    rf=0
-    rm=stocks_daily_return['sp500'].mean()*252
     return_df=pd.DataFrame()
-    return_value=[]
-    for stock,value in beta.items():
-        return_value.append(str(round(rf+(value*(rm-rf)),2)))
-    return_df['Stock']=stocks_list
-    return_df['Return Value']=return_value
+    return_df['Stock']=capm_df.index
+    return_df['Return Value']=[str(round(i,2)) for i in capm_df['Expected Return']]
 
     with col2:
         st.markdown('### Calculated Return using CAPM')
         st.dataframe(return_df,use_container_width=True)
 except:
-    st.write("Please select valid inputs")
\ No newline at end of file
+    st.write("Please select valid inputs")
+
+finish_run()
\ No newline at end of file
@@ -1,12 +1,16 @@
 import streamlit as st
 import pandas as pd
-import yfinance as yf
 import datetime
-from db_manager import get_portfolio, add_transaction
+from db_manager import get_holdings, get_portfolio, add_transaction, import_transactions, IMPORT_DATE_FORMATS
+from pages.utils.quote_service import get_quotes
+from pages.utils.portfolio_history import close_matrix, portfolio_history
+from pages.utils.risk_engine import risk_report
 import plotly.express as px
+from pages.utils.instrumentation import begin_run, finish_run
 
 # --- Page Configuration ---
 st.set_page_config(page_title="Portfolio Tracker", layout="wide")
+begin_run()
 st.title("📈 My Portfolio Tracker")
 
 # --- Authentication Check ---
@@ -36,32 +40,38 @@ else:
             else:
                 st.error("Please fill out all fields correctly.")
 
+    # --- Bulk Import from Broker CSV ---
+    with st.expander("Import Transactions from CSV"):
+        st.write("The file needs ticker, shares, price and date columns (Symbol, Quantity and Trade Date also work).")
+        uploaded_file = st.file_uploader("Broker CSV", type=["csv"])
+        date_format = st.selectbox("Date format in the file", list(IMPORT_DATE_FORMATS))
+        if uploaded_file is not None and st.button("Import Transactions"):
+            try:
+                imported, errors = import_transactions(username, pd.read_csv(uploaded_file), date_format)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                st.success(f"Imported {imported} transactions.")
+                if not errors.empty:
+                    st.warning(f"{len(errors)} rows were skipped:")
+                    st.dataframe(errors, use_container_width=True)
+
     st.markdown("---")
 
     # --- Portfolio Display ---
     st.header("Portfolio Overview")
-    portfolio_df = get_portfolio(username)
+    # Holdings are aggregated in the database as transactions are added
+    summary_df = get_holdings(username)
 
-    if portfolio_df.empty:
+    if summary_df.empty:
         st.info("Your portfolio is empty. Add a transaction above to get started.")
     else:
-        tickers = portfolio_df['ticker'].unique().tolist()
-        
-        # Fetch current market prices for all tickers in the portfolio
-        live_prices_df = yf.download(tickers, start=datetime.date.today() - datetime.timedelta(days=5), progress=False)['Close']
+        tickers = summary_df['ticker'].tolist()
         
-        # Get the most recent price for each ticker
-        current_prices = {ticker: live_prices_df[ticker].dropna().iloc[-1] for ticker in tickers if not live_prices_df[ticker].dropna().empty}
+        # Get the most recent price for each ticker from the shared quote cache
+        current_prices = {ticker: quote['price'] for ticker, quote in get_quotes(tickers).items() if quote}
 
         # --- Calculate Portfolio Metrics ---
-        portfolio_df['cost_basis'] = portfolio_df['shares'] * portfolio_df['purchase_price']
-        
-        # Aggregate data by ticker
-        summary_df = portfolio_df.groupby('ticker').agg(
-            total_shares=('shares', 'sum'),
-            total_cost=('cost_basis', 'sum')
-        ).reset_index()
-        
         summary_df['avg_purchase_price'] = summary_df['total_cost'] / summary_df['total_shares']
         summary_df['current_price'] = summary_df['ticker'].map(current_prices)
         summary_df.dropna(subset=['current_price'], inplace=True) # Drop if price fetch failed
@@ -82,7 +92,7 @@ else:
 
         # --- Visualizations & Detailed View ---
         st.markdown("---")
-        tab1, tab2 = st.tabs(["📊 Asset Allocation", "📄 Detailed Holdings"])
+        tab1, tab2, tab3, tab4 = st.tabs(["📊 Asset Allocation", "📄 Detailed Holdings", "📈 Performance", "⚠️ Risk"])
 
         with tab1:
             st.subheader("Asset Allocation by Current Value")
@@ -102,3 +112,50 @@ else:
                 'Avg. Price': '${:,.2f}', 'Current Price': '${:,.2f}', 'Current Value': '${:,.2f}',
                 'Gain/Loss ($)': '${:,.2f}', 'Gain/Loss (%)': '{:.2f}%'
             }), use_container_width=True)
+
+        with tab3:
+            st.subheader("Portfolio Value Over Time")
+            transactions_df = get_portfolio(username)
+            prices = close_matrix(sorted(transactions_df['ticker'].unique()), transactions_df['purchase_date'].min())
+            # Extended from the previous rerun's result when only new days or transactions were added
+            history = portfolio_history(username, transactions_df, prices)
+            if history.empty:
+                st.info("No price history is available for your holdings yet.")
+            else:
+                fig = px.line(history, y=['Value', 'Cost Basis'], title='Value vs. Cost Basis')
+                fig.update_layout(yaxis_title='USD', legend_title_text='')
+                st.plotly_chart(fig, use_container_width=True)
+                fig = px.area(history, y='P&L', title='Unrealized Gain/Loss')
+                fig.update_layout(yaxis_title='USD')
+                st.plotly_chart(fig, use_container_width=True)
+
+        with tab4:
+            st.subheader("Value at Risk")
+            with st.form("risk_form"):
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    confidence = st.selectbox("Confidence Level", [0.90, 0.95, 0.99], index=1, format_func=lambda c: f"{c:.0%}")
+                with col2:
+                    horizon_days = st.selectbox("Horizon", [1, 10, 21, 252], index=3, format_func=lambda d: f"{d} trading days")
+                with col3:
+                    n_paths = st.selectbox("Simulated Paths", [10_000, 50_000, 100_000], index=2, format_func=lambda n: f"{n:,}")
+                run_risk = st.form_submit_button("Run Risk Analysis")
+            if run_risk:
+                position_values = summary_df.set_index('ticker')['current_value']
+                start = (datetime.date.today() - datetime.timedelta(days=3 * 365)).isoformat()
+                returns = close_matrix(position_values.index.tolist(), start).pct_change().iloc[1:]
+                position_values = position_values[position_values.index.isin(returns.columns)]
+                if position_values.empty or len(returns) < 30:
+                    st.error("Not enough price history to estimate risk for your holdings.")
+                else:
+                    with st.spinner("Simulating portfolio paths..."):
+                        risk_df, terminal_values = risk_report(position_values, returns, confidence, horizon_days, n_paths)
+                    st.dataframe(risk_df.style.format({
+                        'VaR': '${:,.2f}', 'CVaR': '${:,.2f}', 'VaR (%)': '{:.2f}%', 'CVaR (%)': '{:.2f}%'
+                    }), use_container_width=True)
+                    fig = px.histogram(x=terminal_values - position_values.sum(), nbins=100, title='Simulated Gain/Loss at Horizon')
+                    fig.add_vline(x=-risk_df.loc['Monte Carlo', 'VaR'], line_dash='dash', line_color='red')
+                    fig.update_layout(xaxis_title='USD', yaxis_title='Paths')
+                    st.plotly_chart(fig, use_container_width=True)
+
+finish_run()
\ No newline at end of file
@@ -1,16 +1,20 @@
 import streamlit as st
 import pandas as pd
-import yfinance as yf
 import plotly.graph_objects as go
 import datetime
 import ta 
 from pages.utils.plotly_figure import plotly_table, candlestick, RSI, close_chart, MACD, Moving_average
+from pages.utils.price_store import get_prices
+from pages.utils.fundamentals import get_fundamentals
+from pages.utils.backtest_engine import run_backtest, INITIAL_CAPITAL
+from pages.utils.instrumentation import begin_run, finish_run
 
 st.set_page_config(
     page_title='Stock Analysis',
     page_icon='page_with_curl',
     layout='wide',
 )
+begin_run()
 
 st.title("Stock Analysis")
 
@@ -26,27 +30,27 @@ with col3:
 
 st.subheader(ticker) 
 
-stock = yf.Ticker(ticker)
+stock_info = get_fundamentals(ticker)
 
-st.write(stock.info['longBusinessSummary']) 
-st.write("**Sector:**",stock.info['sector'])
-st.write("**Full Time Employees:**",stock.info['fullTimeEmployees'])
-st.write("**Website:**",stock.info['website'])
+st.write(stock_info['longBusinessSummary']) 
+st.write("**Sector:**",stock_info['sector'])
+st.write("**Full Time Employees:**",stock_info['fullTimeEmployees'])
+st.write("**Website:**",stock_info['website'])
 
 col1, col2 = st.columns(2)
 
 with col1:
     df=pd.DataFrame(index=['Market Cap','Beta','EPS','PE Ratio'])
-    df['']=[stock.info["marketCap"],stock.info["beta"],stock.info["trailingEps"],stock.info["trailingPE"]]
+    df['']=[stock_info["marketCap"],stock_info["beta"],stock_info["trailingEps"],stock_info["trailingPE"]]
     fig_df=plotly_table(df)
     st.plotly_chart(fig_df, use_container_width=True)
 with col2:
     df=pd.DataFrame(index=['Quick Ratio','Revenue per share','Profit Margins','Debt to Equity','Return on Equity'])
-    df['']=[stock.info['quickRatio'],stock.info['revenuePerShare'],stock.info['profitMargins'],stock.info['debtToEquity'],stock.info['returnOnEquity']]
+    df['']=[stock_info['quickRatio'],stock_info['revenuePerShare'],stock_info['profitMargins'],stock_info['debtToEquity'],stock_info['returnOnEquity']]
     fig_df=plotly_table(df)
     st.plotly_chart(fig_df,use_container_width=True)
 
-data=yf.download(ticker,start=start_date,end=end_date)
+data=get_prices(ticker,start=start_date,end=end_date)
 
 col1, col2, col3=st.columns(3)
 daily_change=data["Close"].iloc[-1] - data["Close"].iloc[-2]
@@ -92,46 +96,68 @@ with col2:
     else:
         indicators=st.selectbox('',('RSI','Moving Average','MACD'))
 
-ticker_=yf.Ticker(ticker)
-new_df1=ticker_.history(period='max')
-data1=ticker_.history(period='max')
+new_df1=get_prices(ticker)
+data1=new_df1
 
 if num_period=='':
     if chart_type=='Candle' and indicators=='RSI':
         st.plotly_chart(candlestick(data1,'1y'),use_container_width=True)
-        st.plotly_chart(RSI(data1,'1y'),use_container_width=True)
+        st.plotly_chart(RSI(data1,'1y',ticker),use_container_width=True)
 
     if chart_type=='Candle' and indicators=='MACD':
         st.plotly_chart(candlestick(data1,'1y'),use_container_width=True)
-        st.plotly_chart(MACD(data1,'1y'),use_container_width=True)
+        st.plotly_chart(MACD(data1,'1y',ticker),use_container_width=True)
 
     if chart_type=='Line' and indicators=='RSI':
         st.plotly_chart(close_chart(data1,'1y'),use_container_width=True)
-        st.plotly_chart(RSI(data1,'1y'),use_container_width=True)
+        st.plotly_chart(RSI(data1,'1y',ticker),use_container_width=True)
 
     if chart_type=='Line' and indicators=='Moving Average':
-        st.plotly_chart(Moving_average(data1,'1y'),use_container_width=True)
+        st.plotly_chart(Moving_average(data1,'1y',ticker),use_container_width=True)
 
     if chart_type=='Line' and indicators=='MACD':
         st.plotly_chart(close_chart(data1,'1y'),use_container_width=True)
-        st.plotly_chart(MACD(data1,'1y'),use_container_width=True)
+        st.plotly_chart(MACD(data1,'1y',ticker),use_container_width=True)
 
 else:
     if chart_type=='Candle' and indicators=='RSI':
         st.plotly_chart(candlestick(new_df1,num_period),use_container_width=True)
-        st.plotly_chart(RSI(new_df1,num_period),use_container_width=True)
+        st.plotly_chart(RSI(new_df1,num_period,ticker),use_container_width=True)
 
     if chart_type=='Candle' and indicators=='MACD':
         st.plotly_chart(candlestick(new_df1,num_period),use_container_width=True)
-        st.plotly_chart(MACD(new_df1,num_period),use_container_width=True)
+        st.plotly_chart(MACD(new_df1,num_period,ticker),use_container_width=True)
 
     if chart_type=='Line' and indicators=='RSI':
         st.plotly_chart(close_chart(new_df1,num_period),use_container_width=True)
-        st.plotly_chart(RSI(new_df1,num_period),use_container_width=True)
+        st.plotly_chart(RSI(new_df1,num_period,ticker),use_container_width=True)
 
     if chart_type=='Line' and indicators=='Moving Average':
-        st.plotly_chart(Moving_average(new_df1,num_period),use_container_width=True)
+        st.plotly_chart(Moving_average(new_df1,num_period,ticker),use_container_width=True)
 
     if chart_type=='Line' and indicators=='MACD':
         st.plotly_chart(close_chart(new_df1,num_period),use_container_width=True)
-        st.plotly_chart(MACD(new_df1,num_period),use_container_width=True)
\ No newline at end of file
+        st.plotly_chart(MACD(new_df1,num_period,ticker),use_container_width=True)
+
+st.write('##### Strategy Backtest')
+col1, col2, col3 = st.columns(3)
+with col1:
+    strategy = st.selectbox('Signal', ('MACD', 'RSI', 'SMA 50'))
+with col2:
+    fee_bps = st.number_input('Fee per trade (bps)', min_value=0.0, value=5.0, step=1.0)
+with col3:
+    if strategy == 'RSI':
+        rsi_lower, rsi_upper = st.slider('RSI buy / sell levels', 0, 100, (30, 70))
+
+signal = {'MACD': 'macd', 'RSI': 'rsi', 'SMA 50': 'sma'}[strategy]
+params = {'lower': rsi_lower, 'upper': rsi_upper} if strategy == 'RSI' else {}
+equity, fills, stats = run_backtest(data['Close'].rename(ticker).to_frame(), signal, params, fee_bps)
+
+fig = go.Figure()
+fig.add_trace(go.Scatter(x=equity.index, y=equity[ticker], mode='lines', name=f'{strategy} Strategy'))
+fig.add_trace(go.Scatter(x=data.index, y=INITIAL_CAPITAL * data['Close'] / data['Close'].iloc[0], mode='lines', name='Buy & Hold'))
+fig.update_layout(title=f'Growth of ${INITIAL_CAPITAL:,.0f}', height=500, yaxis_title='USD', legend=dict(yanchor='top', xanchor='right'))
+st.plotly_chart(fig, use_container_width=True)
+st.plotly_chart(plotly_table(stats.T.round(2)), use_container_width=True)
+
+finish_run()
\ No newline at end of file
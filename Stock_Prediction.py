@@ -1,19 +1,29 @@
 import streamlit as st
-from pages.utils.model_train import get_data, get_rolling_mean, get_differencing_order,scaling,evaluate_model,get_forecast,inverse_scaling
+from pages.utils.model_train import get_data, get_rolling_mean, get_differencing_order,scaling,forecast_prices,compare_backends,walk_forward,BACKEND_LABELS,DEFAULT_BACKEND
+from db_manager import create_tables, get_stored_forecast, save_forecast
 import pandas as pd
 import numpy as np
 from pages.utils.plotly_figure import plotly_table, Moving_average_forecast
+from pages.utils.instrumentation import begin_run, finish_run
+
+# The page reads and writes the forecasts table, so make sure it exists
+create_tables()
 
 st.set_page_config(
     page_title='Stock Prediction',
     page_icon='chart_with_downwards_trend',
     layout='wide'
 )
+begin_run()
 st.title('Stock Prediction')
 col1,col2,col3=st.columns(3)
 
 with col1:
     ticker=st.text_input('Stock Ticker','AAPL')
+with col2:
+    labels=list(BACKEND_LABELS)
+    default_index=list(BACKEND_LABELS.values()).index(DEFAULT_BACKEND)
+    backend=BACKEND_LABELS[st.selectbox('Model',labels,index=default_index)]
 
 rmse=0
 
@@ -22,20 +32,45 @@ st.subheader('Predicting Next 30 days Close Price: '+ticker)
 close_price=get_data(ticker)
 rolling_price=get_rolling_mean(close_price)
 
-differencing_order=get_differencing_order(rolling_price)
-scaled_data,scaler=scaling(rolling_price)
-rmse=evaluate_model(scaled_data,differencing_order)
+# Serve the forecast precomputed by the batch job when there is a fresh one; otherwise train now
+# and store the result so the next view of this ticker is served from the database.
+stored=get_stored_forecast(ticker,backend)
+if stored is not None:
+    forecast,rmse=stored['forecast'],stored['rmse']
+    st.caption(f"Precomputed forecast from {stored['created_at']} UTC (prices up to {stored['data_end']}).")
+else:
+    forecast,rmse,metadata=forecast_prices(rolling_price,ticker,backend)
+    save_forecast(ticker,backend,forecast,rmse,metadata,rolling_price.index[-1])
 
 st.write("**Model RMSE Score:**",rmse)
 
-forecast = get_forecast(scaled_data, differencing_order)
-
-
-forecast['Close'] = inverse_scaling(scaler, forecast['Close'])
 st.write('##### Forecast Data (Next 30 Days)')
 fig_tail = plotly_table(forecast.sort_index(ascending=True).round(3))
 fig_tail.update_layout(height=220)
 st.plotly_chart(fig_tail, use_container_width=True)
 
 forecast = pd.concat([rolling_price, forecast])
-st.plotly_chart(Moving_average_forecast(forecast.iloc[150:]), use_container_width=True)
\ No newline at end of file
+st.plotly_chart(Moving_average_forecast(forecast.iloc[150:]), use_container_width=True)
+
+with st.expander('Compare forecasting models'):
+    st.write('Scores every model on the same 30-day holdout. The full ARIMA can take tens of seconds.')
+    if st.button('Run comparison'):
+        differencing_order=get_differencing_order(rolling_price)
+        scaled_data,scaler=scaling(rolling_price)
+        st.dataframe(compare_backends(scaled_data,differencing_order),use_container_width=True)
+
+with st.expander('Walk-forward evaluation'):
+    st.write('Forecasts from 20 origins, 5 days apart, and reports the error at each horizon. '
+             'ARIMA models are fitted once and then updated with each new observation.')
+    if st.button('Run walk-forward evaluation'):
+        differencing_order=get_differencing_order(rolling_price)
+        scaled_data,scaler=scaling(rolling_price,ticker)
+        try:
+            summary,errors=walk_forward(scaled_data,differencing_order,ticker,backend)
+        except ValueError as e:
+            st.warning(str(e))
+        else:
+            st.line_chart(summary[['RMSE','MAE','Median |Error|','P95 |Error|']])
+            st.dataframe(summary.round(4),use_container_width=True)
+
+finish_run()
\ No newline at end of file
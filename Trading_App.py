@@ -1,9 +1,9 @@
 import streamlit as st
 from authenticator import check_password, create_user
-from db_manager import create_tables, get_portfolio
-import yfinance as yf
-import datetime
-import pandas as pd
+from db_manager import create_tables, get_holdings
+from pages.utils.quote_service import get_quotes
+from pages.utils.quote_stream import stream_quotes, REFRESH_SECONDS
+from pages.utils.instrumentation import begin_run, finish_run
 
 # --- Initialize Database ---
 create_tables()
@@ -14,6 +14,7 @@ st.set_page_config(
     page_icon='📈',
     layout='wide'
 )
+begin_run()
 
 # --- THEME: Hot Pink & Onyx (Dark Theme) ---
 # A modern, high-contrast theme with a black background and pink accents.
@@ -111,41 +112,42 @@ else:
         "NASDAQ": "^IXIC",
         "Dow Jones": "^DJI"
     }
-    
-    cols = st.columns(len(market_tickers))
-    for i, (name, ticker) in enumerate(market_tickers.items()):
+
+    # Only this fragment reruns on the timer; it reads the shared quote board filled by a background producer
+    @st.fragment(run_every=REFRESH_SECONDS)
+    def market_overview(market_tickers):
+        cols = st.columns(len(market_tickers))
         try:
-            data = yf.Ticker(ticker).history(period="2d")
-            if not data.empty:
-                price = data['Close'].iloc[-1]
-                delta = data['Close'].diff().iloc[-1]
-                cols[i].metric(label=name, value=f"{price:,.2f}", delta=f"{delta:,.2f}")
+            market_quotes = stream_quotes(list(market_tickers.values()))
         except Exception:
-            cols[i].metric(label=name, value="N/A", delta="Error")
+            market_quotes = {}
+        for i, (name, ticker) in enumerate(market_tickers.items()):
+            quote = market_quotes.get(ticker)
+            if quote and quote['prev_close'] is not None:
+                price = quote['price']
+                delta = price - quote['prev_close']
+                cols[i].metric(label=name, value=f"{price:,.2f}", delta=f"{delta:,.2f}")
+            else:
+                cols[i].metric(label=name, value="N/A", delta="Error")
+
+    market_overview(market_tickers)
 
     st.markdown("---")
 
     # --- Portfolio Snapshot Section ---
     st.header("Your Portfolio Snapshot")
-    portfolio_df = get_portfolio(st.session_state['username'])
+    summary_df = get_holdings(st.session_state['username'])
 
-    if portfolio_df.empty:
+    if summary_df.empty:
         st.info("Your portfolio is empty. Navigate to the 'Portfolio Tracker' page from the sidebar to add your first transaction.")
     else:
-        tickers = portfolio_df['ticker'].unique().tolist()
-        live_prices_df = yf.download(tickers, start=datetime.date.today() - datetime.timedelta(days=5), progress=False)['Close']
-        current_prices = {ticker: live_prices_df[ticker].dropna().iloc[-1] for ticker in tickers if not live_prices_df[ticker].dropna().empty}
+        tickers = summary_df['ticker'].tolist()
+        current_prices = {ticker: quote['price'] for ticker, quote in get_quotes(tickers).items() if quote}
 
-        portfolio_df['cost_basis'] = portfolio_df['shares'] * portfolio_df['purchase_price']
-        summary_df = portfolio_df.groupby('ticker').agg(total_cost=('cost_basis', 'sum')).reset_index()
         summary_df['current_price'] = summary_df['ticker'].map(current_prices)
         summary_df.dropna(subset=['current_price'], inplace=True)
-        
-        # We need total shares from the original df for current value calculation
-        shares_summary = portfolio_df.groupby('ticker')['shares'].sum().reset_index()
-        summary_df = pd.merge(summary_df, shares_summary, on='ticker')
 
-        summary_df['current_value'] = summary_df['shares'] * summary_df['current_price']
+        summary_df['current_value'] = summary_df['total_shares'] * summary_df['current_price']
         
         total_portfolio_value = summary_df['current_value'].sum()
         total_portfolio_cost = summary_df['total_cost'].sum()
@@ -159,4 +161,6 @@ else:
     if st.sidebar.button("Logout"):
         st.session_state['logged_in'] = False
         st.session_state['username'] = ''
-        st.rerun()
\ No newline at end of file
+        st.rerun()
+
+finish_run()
\ No newline at end of file
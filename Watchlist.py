@@ -1,9 +1,11 @@
 import streamlit as st
 from db_manager import get_user_watchlist, add_to_watchlist, remove_from_watchlist
-import yfinance as yf
+from pages.utils.quote_stream import stream_quotes, REFRESH_SECONDS
 import pandas as pd
+from pages.utils.instrumentation import begin_run, finish_run
 
 st.set_page_config(page_title='My Watchlist', layout='wide')
+begin_run()
 st.title("📈 My Watchlist")
 
 # Ensure the user is logged in to see this page
@@ -30,25 +32,34 @@ else:
     st.header("Current Watchlist")
     watchlist = get_user_watchlist(username)
 
-    if not watchlist:
-        st.info("Your watchlist is empty. Add a stock ticker above to get started.")
-    else:
+    # Only the price table reruns on the timer; it reads the shared quote board filled by a background producer
+    @st.fragment(run_every=REFRESH_SECONDS)
+    def watchlist_table(watchlist):
         # Create a table-like display with columns
         col1, col2, col3, col4 = st.columns([2, 2, 2, 1])
         headers = ["Ticker", "Current Price", "% Change", "Remove"]
         for header, col in zip(headers, [col1, col2, col3, col4]):
             col.markdown(f"**{header}**")
         
-        # Fetch and display data for each ticker
+        try:
+            quotes = stream_quotes(watchlist)
+        except Exception:
+            quotes = None
+
         for ticker in watchlist:
             with col1:
                 st.write(ticker)
             
-            try:
-                data = yf.Ticker(ticker).history(period="2d")
-                if not data.empty:
-                    price = data['Close'].iloc[-1]
-                    prev_price = data['Close'].iloc[-2]
+            if quotes is None:
+                with col2:
+                    st.write("Error")
+                with col3:
+                    st.write("Error")
+            else:
+                quote = quotes.get(ticker)
+                if quote and quote['prev_close'] is not None:
+                    price = quote['price']
+                    prev_price = quote['prev_close']
                     change_pct = ((price - prev_price) / prev_price) * 100
                     
                     with col2:
@@ -60,14 +71,15 @@ else:
                         st.write("N/A")
                     with col3:
                         st.write("N/A")
-
-            except Exception:
-                with col2:
-                    st.write("Error")
-                with col3:
-                    st.write("Error")
             
             with col4:
                 if st.button(f"🗑️", key=f"del_{ticker}"):
                     remove_from_watchlist(username, ticker)
                     st.rerun()
+
+    if not watchlist:
+        st.info("Your watchlist is empty. Add a stock ticker above to get started.")
+    else:
+        watchlist_table(watchlist)
+
+finish_run()
\ No newline at end of file
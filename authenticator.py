@@ -8,10 +8,7 @@ def hash_password(password):
 def check_password(username, password):
     """Checks if the provided password matches the stored hash for a user."""
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT password FROM users WHERE username = ?", (username,))
-    user = cursor.fetchone()
-    conn.close()
+    user = conn.execute("SELECT password FROM users WHERE username = ?", (username,)).fetchone()
     if user and user['password'] == hash_password(password):
         return True
     return False
@@ -19,13 +16,10 @@ def check_password(username, password):
 def create_user(username, password):
     """Creates a new user with a hashed password."""
     conn = get_db_connection()
-    cursor = conn.cursor()
     try:
-        cursor.execute("INSERT INTO users (username, password) VALUES (?, ?)", 
-                       (username, hash_password(password)))
-        conn.commit()
-        conn.close()
+        with conn:
+            conn.execute("INSERT INTO users (username, password) VALUES (?, ?)", 
+                         (username, hash_password(password)))
         return True
     except conn.IntegrityError: # This error occurs if the username is already taken
-        conn.close()
         return False
\ No newline at end of file
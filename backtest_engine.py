@@ -0,0 +1,140 @@
+import os
+import itertools
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from pages.utils.indicators import indicator_panel, SMA_LENGTH
+from pages.utils.instrumentation import timed
+
+TRADING_DAYS = 252
+DEFAULT_FEE_BPS = 5.0
+INITIAL_CAPITAL = 10_000.0
+# Below this many tickers (times parameter sets) the process pool costs more than it saves.
+PARALLEL_MIN_TASKS = 50
+
+def rsi_signal(indicators, closes, lower=30, upper=70):
+    """Long after RSI drops below `lower`, flat after it rises above `upper`, otherwise hold."""
+    rsi = indicators['RSI']
+    events = pd.DataFrame(np.where(rsi < lower, 1.0, np.where(rsi > upper, 0.0, np.nan)),
+                          index=closes.index, columns=closes.columns)
+    return events.ffill().fillna(0.0)
+
+def macd_signal(indicators, closes):
+    """Long while the MACD line is above its signal line."""
+    return (indicators['MACD'] > indicators['MACD Signal']).astype(float)
+
+def sma_signal(indicators, closes):
+    """Long while the close is above its SMA."""
+    return (closes > indicators[f'SMA_{SMA_LENGTH}']).astype(float)
+
+# Each signal maps (indicator frames, close panel, **params) to a 0/1 target position panel.
+SIGNALS = {
+    'rsi': (rsi_signal, ['RSI']),
+    'macd': (macd_signal, ['MACD', 'MACD Signal']),
+    'sma': (sma_signal, [f'SMA_{SMA_LENGTH}']),
+}
+
+def _max_drawdown(equity):
+    return (equity / np.maximum.accumulate(equity, axis=0) - 1).min(axis=0)
+
+def simulate(closes, target, fee_bps=DEFAULT_FEE_BPS, initial_capital=INITIAL_CAPITAL):
+    """Runs the positions through the whole panel at once; gaps after a ticker's first price are forward-filled.
+
+    The target decided on bar t's close is filled at that close, so it earns bar t + 1's return.
+    Fees are charged on every change in position as fee_bps of the traded notional.
+    Returns (equity DataFrame, fills DataFrame of position changes, stats DataFrame per ticker).
+    """
+    prices = closes.ffill().to_numpy(dtype=float)
+    listed = ~np.isnan(prices)
+    returns = np.zeros_like(prices)
+    returns[1:] = prices[1:] / prices[:-1] - 1
+    returns = np.nan_to_num(returns)
+
+    # Nothing can be held before a ticker has prices.
+    target = np.where(listed, target.to_numpy(dtype=float), 0.0)
+    position = np.zeros_like(target)
+    position[1:] = target[:-1]
+    fills = np.diff(target, axis=0, prepend=0.0)
+    fees = np.abs(fills) * fee_bps / 10_000
+
+    # The fee comes out of the equity left after the bar's return.
+    strategy_returns = (1 + position * returns) * (1 - fees) - 1
+    equity = initial_capital * np.cumprod(1 + strategy_returns, axis=0)
+
+    columns = np.arange(prices.shape[1])
+    first = np.argmax(listed, axis=0)
+    bars = np.maximum(listed.sum(axis=0), 1)
+    total_return = equity[-1] / initial_capital - 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        volatility = strategy_returns.std(axis=0) * np.sqrt(TRADING_DAYS)
+        sharpe = np.where(volatility > 0, strategy_returns.mean(axis=0) * TRADING_DAYS / volatility, np.nan)
+        buy_and_hold = prices[-1] / prices[first, columns] - 1
+
+    stats = pd.DataFrame({
+        'Total Return (%)': total_return * 100,
+        'CAGR (%)': (np.power(1 + total_return, TRADING_DAYS / bars) - 1) * 100,
+        'Sharpe': sharpe,
+        'Max Drawdown (%)': _max_drawdown(equity) * 100,
+        'Trades': (fills != 0).sum(axis=0),
+        'Exposure (%)': position.sum(axis=0) / bars * 100,
+        'Fees Paid (%)': fees.sum(axis=0) * 100,
+        'Buy & Hold (%)': buy_and_hold * 100,
+    }, index=closes.columns)
+    equity = pd.DataFrame(equity, index=closes.index, columns=closes.columns)
+    fills = pd.DataFrame(fills, index=closes.index, columns=closes.columns)
+    return equity, fills, stats
+
+def _backtest_chunk(args):
+    closes, signal, params, fee_bps, initial_capital = args
+    signal_fn, indicator_names = SIGNALS[signal]
+    indicators = indicator_panel(closes, indicator_names)
+    target = signal_fn(indicators, closes, **params)
+    return simulate(closes, target, fee_bps, initial_capital)
+
+def _map(fn, tasks, max_workers):
+    if len(tasks) == 1 or max_workers == 1:
+        return [fn(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(fn, tasks))
+
+@timed('compute')
+def run_backtest(closes, signal='macd', params=None, fee_bps=DEFAULT_FEE_BPS, initial_capital=INITIAL_CAPITAL,
+                 max_workers=None):
+    """Backtests one signal on every ticker of a close-price panel (dates x tickers).
+
+    Large panels are split into column chunks, one per worker process; tickers are independent,
+    so the result is the same as running the whole panel in one process.
+    Returns (equity, fills, stats) as described in simulate().
+    """
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame()
+    params = params or {}
+    n_workers = max_workers or os.cpu_count() or 1
+    if closes.shape[1] < PARALLEL_MIN_TASKS:
+        n_workers = 1
+    chunks = np.array_split(np.arange(closes.shape[1]), n_workers)
+    tasks = [(closes.iloc[:, chunk], signal, params, fee_bps, initial_capital) for chunk in chunks if len(chunk)]
+    results = _map(_backtest_chunk, tasks, n_workers)
+    equity = pd.concat([result[0] for result in results], axis=1)
+    fills = pd.concat([result[1] for result in results], axis=1)
+    stats = pd.concat([result[2] for result in results])
+    return equity, fills, stats
+
+def _sweep_task(args):
+    _, _, stats = _backtest_chunk(args)
+    return stats
+
+@timed('compute')
+def parameter_sweep(closes, signal, param_grid, fee_bps=DEFAULT_FEE_BPS, max_workers=None):
+    """Backtests every combination in `param_grid` (e.g. {'lower': [20, 30], 'upper': [70, 80]}).
+
+    Each parameter set is one task for the process pool. Returns the per-ticker stats of every
+    combination, indexed by the parameters and the ticker.
+    """
+    names = list(param_grid)
+    combos = list(itertools.product(*param_grid.values()))
+    tasks = [(closes, signal, dict(zip(names, combo)), fee_bps, INITIAL_CAPITAL) for combo in combos]
+    if len(tasks) * closes.shape[1] < PARALLEL_MIN_TASKS:
+        max_workers = 1
+    results = _map(_sweep_task, tasks, max_workers)
+    return pd.concat(results, keys=combos, names=names + ['Ticker'])
@@ -0,0 +1,204 @@
+"""Offline benchmarks for the app's hot paths, on synthetic data so no network access is needed.
+
+Run from the repository root:
+
+    python -m pages.utils.benchmark                    # compare against the stored baseline
+    python -m pages.utils.benchmark --update-baseline  # record a new baseline
+    python -m pages.utils.benchmark --tickers 30 --years 20 --arima
+
+Exits with status 1 when any timing is more than --threshold slower than its baseline.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import pandas as pd
+
+from pages.utils.synthetic_data import synthetic_ohlcv, synthetic_panel, synthetic_tickers
+from pages.utils.return_engine import daily_return, normalize
+from pages.utils.capm_engine import capm_regression
+from pages.utils import plotly_figure
+from pages.utils import model_train
+from pages.utils.forecasters import FAST_FORECASTERS
+from pages.utils.risk_engine import risk_report
+from pages.utils.backtest_engine import run_backtest
+import db_manager
+import authenticator
+
+BASELINE_FILE = "benchmark_baseline.json"
+DEFAULT_THRESHOLD = 0.25
+# Differences smaller than this are timer noise, whatever the ratio.
+MIN_REGRESSION_SECONDS = 0.001
+PERIODS = ['5d', '1mo', '6mo', 'ytd', '1y', '5y', 'max']
+
+def _time(fn, repeat):
+    """Best-of-`repeat` wall time of fn() in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def _bench_returns(results, n_tickers, years, repeat):
+    panel = synthetic_panel(n_tickers, years).reset_index()
+    results['daily_return'] = _time(lambda: daily_return(panel), repeat)
+    results['normalize'] = _time(lambda: normalize(panel), repeat)
+    returns = daily_return(panel)
+    stocks = synthetic_tickers(n_tickers)
+    results['calculate_beta.one_stock'] = _time(lambda: plotly_figure.calculate_beta(returns, stocks[0]), repeat)
+    results['capm_regression.panel'] = _time(lambda: capm_regression(returns[stocks], returns['sp500']), repeat)
+
+def _bench_charts(results, years, repeat):
+    ohlcv = synthetic_ohlcv('CHART', years)
+    results['filter_data.all_periods'] = _time(
+        lambda: [plotly_figure.filter_data(ohlcv, period) for period in PERIODS], repeat)
+    results['period_window.all_periods'] = _time(
+        lambda: [plotly_figure.period_window(ohlcv, period) for period in PERIODS], repeat)
+    # No ticker, so the indicator cache is bypassed and every call computes from scratch.
+    results['chart.RSI'] = _time(lambda: plotly_figure.RSI(ohlcv, '1y'), repeat)
+    results['chart.MACD'] = _time(lambda: plotly_figure.MACD(ohlcv, '1y'), repeat)
+    results['chart.Moving_average.max'] = _time(lambda: plotly_figure.Moving_average(ohlcv, 'max'), repeat)
+    results['chart.candlestick.max'] = _time(lambda: plotly_figure.candlestick(ohlcv, 'max'), repeat)
+
+def _bench_models(results, repeat, include_arima):
+    close = synthetic_ohlcv('MODEL', 2)['Close']
+    rolling_price = model_train.get_rolling_mean(close)
+    differencing_order = model_train.get_differencing_order(rolling_price)
+    scaled_data, _ = model_train.scaling(rolling_price)
+    for backend in FAST_FORECASTERS:
+        results[f'evaluate_model.{backend}'] = _time(
+            lambda: model_train.evaluate_model(scaled_data, differencing_order, backend=backend), repeat)
+    if include_arima:
+        # One run only: a (30,d,30) fit takes tens of seconds.
+        results['evaluate_model.arima'] = _time(
+            lambda: model_train.evaluate_model(scaled_data, differencing_order, backend='arima'), 1)
+
+def _bench_risk(results, repeat):
+    panel = synthetic_panel(50, 3).drop(columns='sp500')
+    returns = panel.pct_change().iloc[1:]
+    position_values = pd.Series(1000.0, index=panel.columns)
+    # In-process so the timing does not depend on the machine's core count.
+    results['risk_report.50_positions.20k_paths'] = _time(
+        lambda: risk_report(position_values, returns, n_paths=20_000, max_workers=1), repeat)
+
+def _bench_backtest(results, n_tickers, years, repeat):
+    closes = synthetic_panel(n_tickers, years).drop(columns='sp500')
+    for signal in ('rsi', 'macd', 'sma'):
+        results[f'run_backtest.{signal}'] = _time(lambda: run_backtest(closes, signal, max_workers=1), repeat)
+
+def _bench_db(results, users, repeat):
+    tickers = synthetic_tickers(25)
+    original_database = db_manager.DATABASE_NAME
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_manager.DATABASE_NAME = os.path.join(tmp_dir, "benchmark.db")
+        try:
+            db_manager.create_tables()
+            usernames = [f"user{i}" for i in range(users)]
+            for username in usernames:
+                authenticator.create_user(username, "password")
+
+            def add_transactions():
+                for i, username in enumerate(usernames):
+                    db_manager.add_transaction(username, tickers[i % len(tickers)], 1.5, 100.0, '2024-01-02')
+            results['db.add_transaction.per_call'] = _time(add_transactions, repeat) / users
+
+            def watchlist_round_trip():
+                for i, username in enumerate(usernames):
+                    db_manager.add_to_watchlist(username, tickers[i % len(tickers)])
+                    db_manager.get_user_watchlist(username)
+                    db_manager.remove_from_watchlist(username, tickers[i % len(tickers)])
+            results['db.watchlist_round_trip.per_user'] = _time(watchlist_round_trip, repeat) / users
+
+            # One heavy user, for the portfolio aggregation paths.
+            heavy_user = usernames[0]
+            for i in range(2000):
+                db_manager.add_transaction(heavy_user, tickers[i % len(tickers)], 1.0, 50.0 + i % 7, '2024-01-02')
+
+            def aggregate_transactions():
+                portfolio_df = db_manager.get_portfolio(heavy_user)
+                portfolio_df['cost_basis'] = portfolio_df['shares'] * portfolio_df['purchase_price']
+                portfolio_df.groupby('ticker').agg(total_shares=('shares', 'sum'), total_cost=('cost_basis', 'sum'))
+            results['portfolio.groupby_transactions'] = _time(aggregate_transactions, repeat)
+            results['portfolio.get_holdings'] = _time(lambda: db_manager.get_holdings(heavy_user), repeat)
+        finally:
+            db_manager.close_db_connection()
+            db_manager.DATABASE_NAME = original_database
+
+def run_benchmarks(n_tickers=8, years=10, users=200, repeat=5, include_arima=False):
+    """Runs every benchmark and returns {name: seconds}."""
+    results = {}
+    _bench_returns(results, n_tickers, years, repeat)
+    _bench_charts(results, years, repeat)
+    _bench_models(results, repeat, include_arima)
+    _bench_risk(results, repeat)
+    _bench_backtest(results, n_tickers, years, repeat)
+    _bench_db(results, users, repeat)
+    return results
+
+def config_key(n_tickers, years, users):
+    # Timings are only comparable for the same problem size.
+    return f"tickers={n_tickers},years={years},users={users}"
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_baseline(path, key, results):
+    baseline = load_baseline(path)
+    baseline[key] = results
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+
+def find_regressions(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Returns a DataFrame of benchmarks slower than baseline * (1 + threshold)."""
+    rows = []
+    for name, seconds in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        if seconds > reference * (1 + threshold) and seconds - reference > MIN_REGRESSION_SECONDS:
+            rows.append({'benchmark': name, 'baseline_s': reference, 'current_s': seconds,
+                         'ratio': seconds / reference})
+    return pd.DataFrame(rows, columns=['benchmark', 'baseline_s', 'current_s', 'ratio'])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tickers', type=int, default=8)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--arima', action='store_true', help='also time the full ARIMA(30,d,30) fit')
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.tickers, args.years, args.users, args.repeat, args.arima)
+    for name, seconds in results.items():
+        print(f"{name:40s} {seconds * 1000:10.3f} ms")
+
+    key = config_key(args.tickers, args.years, args.users)
+    if args.update_baseline:
+        save_baseline(args.baseline, key, results)
+        print(f"Baseline for {key} written to {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline).get(key)
+    if baseline is None:
+        print(f"No baseline for {key} in {args.baseline}; run with --update-baseline to record one.")
+        return 0
+    regressions = find_regressions(results, baseline, args.threshold)
+    if regressions.empty:
+        print(f"No regressions beyond {args.threshold:.0%}.")
+        return 0
+    print(f"Regressions beyond {args.threshold:.0%}:")
+    print(regressions.to_string(index=False))
+    return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+from pages.utils.instrumentation import timed
+
+TRADING_DAYS = 252
+
+@timed('compute')
+def capm_regression(stock_returns, market_returns, rf=0, periods_per_year=TRADING_DAYS):
+    """Regresses every column of `stock_returns` on the market at once.
+
+    Uses the closed-form OLS slope cov(stock, market) / var(market) for all stocks in a single
+    matrix product, which gives the same beta/alpha as np.polyfit(market, stock, 1) per stock.
+    Returns a DataFrame indexed by stock with Beta, Alpha, R Squared, Residual Volatility
+    (annualized, in the units of the returns) and the CAPM Expected Return rf + beta * (rm - rf).
+    """
+    X = stock_returns.to_numpy(dtype=float)
+    m = np.asarray(market_returns, dtype=float)
+    n = len(m)
+
+    m_mean = m.mean()
+    X_mean = X.mean(axis=0)
+    m_centered = m - m_mean
+    ss_market = m_centered @ m_centered
+    ss_stock = ((X - X_mean) ** 2).sum(axis=0)
+    cross = m_centered @ (X - X_mean)
+
+    beta = cross / ss_market
+    alpha = X_mean - beta * m_mean
+    ss_residual = np.maximum(ss_stock - beta * cross, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r_squared = np.where(ss_stock > 0, 1 - ss_residual / ss_stock, np.nan)
+    residual_vol = np.sqrt(ss_residual / max(n - 2, 1) * periods_per_year)
+
+    rm = m_mean * periods_per_year
+    return pd.DataFrame({
+        'Beta': beta,
+        'Alpha': alpha,
+        'R Squared': r_squared,
+        'Residual Volatility': residual_vol,
+        'Expected Return': rf + beta * (rm - rf),
+    }, index=stock_returns.columns)
+
+def _window_sums(values, window):
+    """Sum of each trailing `window` rows via a cumulative sum: O(n) no matter how wide the window is."""
+    cumsum = np.cumsum(values, axis=0)
+    sums = np.full(values.shape, np.nan)
+    sums[window - 1] = cumsum[window - 1]
+    sums[window:] = cumsum[window:] - cumsum[:-window]
+    return sums
+
+@timed('compute')
+def rolling_capm(stock_returns, market_returns, window, periods_per_year=TRADING_DAYS):
+    """Rolling beta, correlation and annualized volatility of every stock over a trailing window.
+
+    Each statistic is built from running sums of x, y, x^2, y^2 and xy, so the whole panel costs
+    O(n) per stock instead of refitting every window. Returns {'Beta', 'Correlation', 'Volatility'},
+    each a DataFrame shaped like `stock_returns`, NaN until the first full window.
+    """
+    X = stock_returns.to_numpy(dtype=float)
+    m = np.asarray(market_returns, dtype=float).reshape(-1, 1)
+    empty = pd.DataFrame(np.nan, index=stock_returns.index, columns=stock_returns.columns)
+    if window < 2 or len(m) < window:
+        return {'Beta': empty, 'Correlation': empty.copy(), 'Volatility': empty.copy()}
+
+    sum_m = _window_sums(m, window)
+    sum_x = _window_sums(X, window)
+    sum_mm = _window_sums(m * m, window)
+    sum_xx = _window_sums(X * X, window)
+    sum_mx = _window_sums(m * X, window)
+
+    # Centered sums of squares and cross-products for each window.
+    ss_m = sum_mm - sum_m ** 2 / window
+    ss_x = np.maximum(sum_xx - sum_x ** 2 / window, 0)
+    cross = sum_mx - sum_m * sum_x / window
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        beta = cross / ss_m
+        correlation = cross / np.sqrt(ss_m * ss_x)
+    volatility = np.sqrt(ss_x / (window - 1) * periods_per_year)
+
+    def frame(values):
+        return pd.DataFrame(values, index=stock_returns.index, columns=stock_returns.columns)
+
+    return {'Beta': frame(beta), 'Correlation': frame(correlation), 'Volatility': frame(volatility)}
@@ -1,113 +1,391 @@
+import json
 import sqlite3
+import threading
 import pandas as pd
+from pages.utils.instrumentation import timed
 
 DATABASE_NAME = "trading_app.db"
 
+# One connection per thread, reused across calls instead of reconnecting every time.
+_local = threading.local()
+
 def get_db_connection():
-    """Establishes a connection to the SQLite database."""
-    conn = sqlite3.connect(DATABASE_NAME)
-    conn.row_factory = sqlite3.Row
+    """Returns this thread's connection to the SQLite database, opening it on first use."""
+    conn = getattr(_local, 'conn', None)
+    if conn is None or getattr(_local, 'database', None) != DATABASE_NAME:
+        conn = sqlite3.connect(DATABASE_NAME, timeout=30)
+        conn.row_factory = sqlite3.Row
+        # WAL lets readers run alongside a writer, which avoids "database is locked" between sessions.
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        _local.conn = conn
+        _local.database = DATABASE_NAME
     return conn
 
-def create_tables():
-    """Creates the users, watchlist, and transactions tables if they don't already exist."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # User table: stores username and hashed password
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL
-        )
-    """)
-    
-    # Watchlist table: links stocks to a specific user
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS watchlist (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
+def close_db_connection():
+    """Closes this thread's connection, if one is open."""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+# --- Schema Migrations ---
+# Each entry upgrades the schema by one version; PRAGMA user_version records how far a database got.
+MIGRATIONS = [
+    # 1: indexes for per-user lookups and one watchlist row per (user, ticker)
+    [
+        "DELETE FROM watchlist WHERE id NOT IN (SELECT MIN(id) FROM watchlist GROUP BY user_id, ticker)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_watchlist_user_ticker ON watchlist (user_id, ticker)",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_user ON transactions (user_id)",
+    ],
+    # 2: per-user holdings, kept in step with transactions by add_transaction
+    [
+        """
+        CREATE TABLE IF NOT EXISTS holdings (
             user_id INTEGER NOT NULL,
             ticker TEXT NOT NULL,
+            total_shares REAL NOT NULL,
+            total_cost REAL NOT NULL,
+            PRIMARY KEY (user_id, ticker),
             FOREIGN KEY (user_id) REFERENCES users (id)
         )
-    """)
-
-    # --- NEW: Transactions table for portfolio tracking ---
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS transactions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
+        """,
+        """
+        INSERT OR REPLACE INTO holdings (user_id, ticker, total_shares, total_cost)
+        SELECT user_id, ticker, SUM(shares), SUM(shares * purchase_price)
+        FROM transactions GROUP BY user_id, ticker
+        """,
+    ],
+    # 3: precomputed forecasts written by the batch forecasting job, one row per (ticker, backend)
+    [
+        """
+        CREATE TABLE IF NOT EXISTS forecasts (
             ticker TEXT NOT NULL,
-            shares REAL NOT NULL,
-            purchase_price REAL NOT NULL,
-            purchase_date TEXT NOT NULL,
-            FOREIGN KEY (user_id) REFERENCES users (id)
+            backend TEXT NOT NULL,
+            data_end TEXT NOT NULL,
+            forecast TEXT NOT NULL,
+            rmse REAL,
+            metadata TEXT,
+            created_at TEXT NOT NULL DEFAULT (datetime('now')),
+            PRIMARY KEY (ticker, backend)
         )
-    """)
+        """,
+    ],
+]
 
-    conn.commit()
-    conn.close()
+def migrate(conn):
+    """Applies every migration newer than the database's recorded schema version."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for new_version, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+        with conn:
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {new_version}")
 
-# --- Watchlist Functions (unchanged) ---
+@timed('db')
+def create_tables():
+    """Creates the users, watchlist, and transactions tables if they don't already exist."""
+    conn = get_db_connection()
+
+    with conn:
+        # User table: stores username and hashed password
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT UNIQUE NOT NULL,
+                password TEXT NOT NULL
+            )
+        """)
+
+        # Watchlist table: links stocks to a specific user
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS watchlist (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                ticker TEXT NOT NULL,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        """)
+
+        # --- NEW: Transactions table for portfolio tracking ---
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS transactions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                ticker TEXT NOT NULL,
+                shares REAL NOT NULL,
+                purchase_price REAL NOT NULL,
+                purchase_date TEXT NOT NULL,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        """)
+
+    migrate(conn)
+
+# --- Watchlist Functions ---
+@timed('db')
 def get_user_watchlist(username):
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT ticker FROM watchlist 
-        JOIN users ON watchlist.user_id = users.id 
+    cursor = conn.execute("""
+        SELECT ticker FROM watchlist
+        JOIN users ON watchlist.user_id = users.id
         WHERE users.username = ?
+        ORDER BY watchlist.id
     """, (username,))
-    watchlist = [row['ticker'] for row in cursor.fetchall()]
-    conn.close()
-    return watchlist
+    return [row['ticker'] for row in cursor.fetchall()]
 
+@timed('db')
 def add_to_watchlist(username, ticker):
-    if ticker.upper() not in get_user_watchlist(username):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
-        user = cursor.fetchone()
-        if user:
-            cursor.execute("INSERT INTO watchlist (user_id, ticker) VALUES (?, ?)", (user['id'], ticker.upper()))
-            conn.commit()
-        conn.close()
-        return True
-    return False
+    """Adds a ticker to the user's watchlist; returns False if it was already there."""
+    conn = get_db_connection()
+    with conn:
+        # The UNIQUE (user_id, ticker) index turns the duplicate check into a single statement.
+        cursor = conn.execute("""
+            INSERT OR IGNORE INTO watchlist (user_id, ticker)
+            SELECT id, ? FROM users WHERE username = ?
+        """, (ticker.upper(), username))
+    return cursor.rowcount > 0
 
+@timed('db')
 def remove_from_watchlist(username, ticker):
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
-    user = cursor.fetchone()
-    if user:
-        cursor.execute("DELETE FROM watchlist WHERE user_id = ? AND ticker = ?", (user['id'], ticker.upper()))
-        conn.commit()
-    conn.close()
-
-# --- NEW: Portfolio Functions ---
+    with conn:
+        conn.execute("""
+            DELETE FROM watchlist
+            WHERE user_id = (SELECT id FROM users WHERE username = ?) AND ticker = ?
+        """, (username, ticker.upper()))
+
+# --- Portfolio Functions ---
+@timed('db')
 def add_transaction(username, ticker, shares, price, date):
-    """Adds a new transaction to a user's portfolio."""
+    """Adds a new transaction to a user's portfolio and updates their holdings in the same SQL transaction."""
+    conn = get_db_connection()
+    with conn:
+        conn.execute("""
+            INSERT INTO transactions (user_id, ticker, shares, purchase_price, purchase_date)
+            SELECT id, ?, ?, ?, ? FROM users WHERE username = ?
+        """, (ticker.upper(), shares, price, date, username))
+        conn.execute("""
+            INSERT INTO holdings (user_id, ticker, total_shares, total_cost)
+            SELECT id, ?, ?, ? FROM users WHERE username = ?
+            ON CONFLICT (user_id, ticker) DO UPDATE SET
+                total_shares = total_shares + excluded.total_shares,
+                total_cost = total_cost + excluded.total_cost
+        """, (ticker.upper(), shares, shares * price, username))
+
+# Common broker CSV headers, mapped onto the transactions columns.
+IMPORT_COLUMN_ALIASES = {
+    'ticker': 'ticker', 'symbol': 'ticker', 'stock': 'ticker',
+    'shares': 'shares', 'quantity': 'shares', 'qty': 'shares',
+    'purchase_price': 'purchase_price', 'price': 'purchase_price', 'fill price': 'purchase_price',
+    'purchase_date': 'purchase_date', 'date': 'purchase_date', 'trade date': 'purchase_date',
+}
+IMPORT_COLUMNS = ['ticker', 'shares', 'purchase_price', 'purchase_date']
+# Date layouts a broker file can use; one applies to the whole column, so 01/02 is never guessed.
+IMPORT_DATE_FORMATS = {
+    'YYYY-MM-DD': '%Y-%m-%d',
+    'MM/DD/YYYY': '%m/%d/%Y',
+    'DD/MM/YYYY': '%d/%m/%Y',
+}
+
+def _trade_dates(values, date_format):
+    """Parses the date column with one format, keeping the local trade date of timestamps.
+
+    Anything after the date (a time, a UTC offset) is dropped without converting, so an
+    after-hours fill at '2024-03-04T19:30:00-05:00' stays on 2024-03-04. Rows that do not
+    match the format come back as NaT.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.tz_localize(None).dt.normalize() if values.dt.tz is not None else values.dt.normalize()
+    date_part = values.astype(str).str.strip().str.split(r'[T ]', n=1, regex=True).str[0]
+    return pd.to_datetime(date_part.where(values.notna()), format=IMPORT_DATE_FORMATS[date_format], errors='coerce')
+
+def validate_transactions(transactions_df, date_format='YYYY-MM-DD'):
+    """Checks every row at once and returns (valid_df, errors_df).
+
+    date_format is a key of IMPORT_DATE_FORMATS and applies to every row.
+    valid_df has the IMPORT_COLUMNS with cleaned values; errors_df lists the rejected rows as
+    (row, error), where row is the 1-based data row of the original file.
+    """
+    if date_format not in IMPORT_DATE_FORMATS:
+        raise ValueError(f"date_format must be one of {list(IMPORT_DATE_FORMATS)}, got {date_format!r}")
+    df = transactions_df.rename(columns=lambda c: IMPORT_COLUMN_ALIASES.get(str(c).strip().lower(), c))
+    missing = [column for column in IMPORT_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    df = df[IMPORT_COLUMNS].copy()
+    df['row'] = range(1, len(df) + 1)
+    # Blank cells must be caught before astype(str) turns them into the ticker 'NAN'.
+    blank_ticker = df['ticker'].isna()
+    df['ticker'] = df['ticker'].astype(str).str.strip().str.upper()
+    df['shares'] = pd.to_numeric(df['shares'], errors='coerce')
+    df['purchase_price'] = pd.to_numeric(df['purchase_price'], errors='coerce')
+    dates = _trade_dates(df['purchase_date'], date_format)
+    df['purchase_date'] = dates.dt.strftime('%Y-%m-%d')
+
+    checks = [
+        (blank_ticker | ~df['ticker'].str.fullmatch(r'[A-Z0-9.^=-]{1,15}'), 'invalid ticker'),
+        (~(df['shares'] > 0), 'shares must be a positive number'),
+        (~(df['purchase_price'] > 0), 'price must be a positive number'),
+        (dates.isna(), f'date is not in {date_format} format'),
+        (dates > pd.Timestamp.today(), 'date is in the future'),
+    ]
+    messages = pd.Series('', index=df.index)
+    for failed, message in checks:
+        messages = messages.where(~failed, messages + message + '; ')
+    has_error = messages != ''
+    errors = pd.DataFrame({'row': df.loc[has_error, 'row'], 'error': messages[has_error].str.rstrip('; ')})
+    return df.loc[~has_error, IMPORT_COLUMNS], errors.reset_index(drop=True)
+
+@timed('db')
+def import_transactions(username, transactions_df, date_format='YYYY-MM-DD'):
+    """Bulk-inserts validated transactions and their holdings updates in one SQL transaction.
+
+    Returns (number of rows imported, errors_df of rejected rows).
+    """
+    valid, errors = validate_transactions(transactions_df, date_format)
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
-    user = cursor.fetchone()
-    if user:
-        cursor.execute("""
-            INSERT INTO transactions (user_id, ticker, shares, purchase_price, purchase_date) 
+    user = conn.execute("SELECT id FROM users WHERE username = ?", (username,)).fetchone()
+    if user is None or valid.empty:
+        return 0, errors
+
+    user_id = user['id']
+    holdings = valid.assign(cost=valid['shares'] * valid['purchase_price']) \
+        .groupby('ticker', as_index=False).agg(total_shares=('shares', 'sum'), total_cost=('cost', 'sum'))
+    with conn:
+        conn.executemany("""
+            INSERT INTO transactions (user_id, ticker, shares, purchase_price, purchase_date)
             VALUES (?, ?, ?, ?, ?)
-        """, (user['id'], ticker.upper(), shares, price, date))
-        conn.commit()
-    conn.close()
+        """, ((user_id, *row) for row in valid.itertuples(index=False, name=None)))
+        conn.executemany("""
+            INSERT INTO holdings (user_id, ticker, total_shares, total_cost)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (user_id, ticker) DO UPDATE SET
+                total_shares = total_shares + excluded.total_shares,
+                total_cost = total_cost + excluded.total_cost
+        """, ((user_id, *row) for row in holdings.itertuples(index=False, name=None)))
+    return len(valid), errors
 
+@timed('db')
 def get_portfolio(username):
-    """Retrieves all transactions for a user and returns them as a pandas DataFrame."""
+    """Retrieves all transactions for a user, oldest entry first, as a pandas DataFrame."""
     conn = get_db_connection()
     query = """
         SELECT ticker, shares, purchase_price, purchase_date FROM transactions
         JOIN users ON transactions.user_id = users.id
         WHERE users.username = ?
+        ORDER BY transactions.id
     """
-    df = pd.read_sql_query(query, conn, params=(username,))
-    conn.close()
-    return df
\ No newline at end of file
+    return pd.read_sql_query(query, conn, params=(username,))
+
+@timed('db')
+def get_holdings(username):
+    """Returns the user's aggregated holdings (ticker, total_shares, total_cost) as a pandas DataFrame."""
+    conn = get_db_connection()
+    query = """
+        SELECT ticker, total_shares, total_cost FROM holdings
+        JOIN users ON holdings.user_id = users.id
+        WHERE users.username = ?
+        ORDER BY ticker
+    """
+    return pd.read_sql_query(query, conn, params=(username,))
+
+@timed('db')
+def rebuild_holdings():
+    """Recomputes holdings from transactions and returns the rows that were out of sync beforehand."""
+    conn = get_db_connection()
+    # Full outer join of stored vs. recomputed holdings, keeping only the rows that disagree.
+    mismatch_query = """
+        WITH expected AS (
+            SELECT user_id, ticker, SUM(shares) AS total_shares, SUM(shares * purchase_price) AS total_cost
+            FROM transactions GROUP BY user_id, ticker
+        ),
+        keys AS (
+            SELECT user_id, ticker FROM expected UNION SELECT user_id, ticker FROM holdings
+        )
+        SELECT keys.user_id, keys.ticker,
+               holdings.total_shares AS stored_shares, expected.total_shares AS expected_shares,
+               holdings.total_cost AS stored_cost, expected.total_cost AS expected_cost
+        FROM keys
+        LEFT JOIN holdings ON holdings.user_id = keys.user_id AND holdings.ticker = keys.ticker
+        LEFT JOIN expected ON expected.user_id = keys.user_id AND expected.ticker = keys.ticker
+        WHERE holdings.total_shares IS NULL OR expected.total_shares IS NULL
+           OR ABS(holdings.total_shares - expected.total_shares) > 1e-9
+           OR ABS(holdings.total_cost - expected.total_cost) > 1e-6
+    """
+    with conn:
+        mismatches = pd.read_sql_query(mismatch_query, conn)
+        conn.execute("DELETE FROM holdings")
+        conn.execute("""
+            INSERT INTO holdings (user_id, ticker, total_shares, total_cost)
+            SELECT user_id, ticker, SUM(shares), SUM(shares * purchase_price)
+            FROM transactions GROUP BY user_id, ticker
+        """)
+    return mismatches
+
+# --- Forecast Functions ---
+# A stored forecast older than this is treated as missing, so the page trains live instead.
+FORECAST_MAX_AGE_HOURS = 24
+
+@timed('db')
+def get_tracked_tickers():
+    """Every ticker in any user's watchlist or portfolio."""
+    conn = get_db_connection()
+    cursor = conn.execute("""
+        SELECT ticker FROM watchlist
+        UNION
+        SELECT ticker FROM holdings WHERE total_shares > 0
+        ORDER BY ticker
+    """)
+    return [row['ticker'] for row in cursor.fetchall()]
+
+@timed('db')
+def save_forecast(ticker, backend, forecast_df, rmse, metadata, data_end):
+    """Stores (or replaces) the forecast for a ticker and backend; forecast_df has a date index and a Close column."""
+    forecast = {
+        'dates': [date.strftime('%Y-%m-%d') for date in forecast_df.index],
+        'close': [float(value) for value in forecast_df['Close']],
+    }
+    conn = get_db_connection()
+    with conn:
+        conn.execute("""
+            INSERT OR REPLACE INTO forecasts (ticker, backend, data_end, forecast, rmse, metadata, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, datetime('now'))
+        """, (ticker.upper(), backend, str(data_end)[:10], json.dumps(forecast), rmse, json.dumps(metadata)))
+
+@timed('db')
+def get_stored_forecast(ticker, backend, max_age_hours=FORECAST_MAX_AGE_HOURS):
+    """Returns the stored forecast if it is younger than max_age_hours, else None.
+
+    The result is a dict with forecast (DataFrame with a Close column), rmse, metadata, data_end and created_at.
+    """
+    conn = get_db_connection()
+    row = conn.execute("""
+        SELECT data_end, forecast, rmse, metadata, created_at FROM forecasts
+        WHERE ticker = ? AND backend = ? AND created_at >= datetime('now', ?)
+    """, (ticker.upper(), backend, f"-{max_age_hours} hours")).fetchone()
+    if row is None:
+        return None
+    forecast = json.loads(row['forecast'])
+    return {
+        'forecast': pd.DataFrame({'Close': forecast['close']}, index=pd.to_datetime(forecast['dates'])),
+        'rmse': row['rmse'],
+        'metadata': json.loads(row['metadata']) if row['metadata'] else {},
+        'data_end': row['data_end'],
+        'created_at': row['created_at'],
+    }
+
+if __name__ == "__main__":
+    import sys
+    if sys.argv[1:] == ["rebuild-holdings"]:
+        create_tables()
+        mismatches = rebuild_holdings()
+        if mismatches.empty:
+            print("Holdings were consistent with transactions.")
+        else:
+            print(f"Fixed {len(mismatches)} inconsistent holdings rows:")
+            print(mismatches.to_string(index=False))
+    else:
+        print("Usage: python db_manager.py rebuild-holdings")
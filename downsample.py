@@ -0,0 +1,65 @@
+import math
+import numpy as np
+import pandas as pd
+
+# Roughly the horizontal resolution of a wide chart; more points than this are not visible anyway.
+DEFAULT_MAX_POINTS = 1500
+
+def _as_float_x(x):
+    if isinstance(x, pd.DatetimeIndex):
+        return x.asi8.astype(float)
+    return np.asarray(x, dtype=float)
+
+def lttb_indices(x, y, max_points):
+    """Largest-Triangle-Three-Buckets: positions of the points that best keep the shape of the line."""
+    n = len(y)
+    if max_points is None or max_points >= n or max_points < 3:
+        return np.arange(n)
+    x = _as_float_x(x)
+    y = np.asarray(y, dtype=float)
+    valid = ~np.isnan(y)
+    if not valid.any():
+        return np.arange(n)
+    if not valid.all():
+        # Gaps (e.g. indicator warm-up) are interpolated only to score points; the output keeps them.
+        y = np.interp(np.arange(n), np.flatnonzero(valid), y[valid])
+
+    every = (n - 2) / (max_points - 2)
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    a = 0
+    for i in range(max_points - 2):
+        avg_start = int(math.floor((i + 1) * every)) + 1
+        avg_end = min(max(int(math.floor((i + 2) * every)) + 1, avg_start + 1), n)
+        avg_x = x[avg_start:avg_end].mean()
+        avg_y = y[avg_start:avg_end].mean()
+
+        start = int(math.floor(i * every)) + 1
+        end = int(math.floor((i + 1) * every)) + 1
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    selected[-1] = n - 1
+    return selected
+
+def downsample_line(x, y, max_points=DEFAULT_MAX_POINTS):
+    """Returns (x, y) reduced to at most `max_points` with LTTB; short series are returned unchanged."""
+    indices = lttb_indices(x, y, max_points)
+    if len(indices) == len(y):
+        return x, y
+    return x[indices], np.asarray(y)[indices]
+
+def downsample_ohlc(dataframe, max_points=DEFAULT_MAX_POINTS):
+    """Merges consecutive bars into at most `max_points` buckets, keeping each bucket's open/high/low/close."""
+    n = len(dataframe)
+    if max_points is None or n <= max_points:
+        return dataframe
+    size = math.ceil(n / max_points)
+    starts = np.arange(0, n, size)
+    ends = np.minimum(starts + size, n) - 1
+    return pd.DataFrame({
+        'Open': dataframe['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(dataframe['High'].to_numpy(), starts),
+        'Low': np.minimum.reduceat(dataframe['Low'].to_numpy(), starts),
+        'Close': dataframe['Close'].to_numpy()[ends],
+    }, index=dataframe.index[starts])
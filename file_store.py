@@ -0,0 +1,24 @@
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+def ticker_key(ticker):
+    """File-name-safe form of a ticker, e.g. 'BRK/B' -> 'BRK_B'."""
+    return re.sub(r'[^A-Za-z0-9.^=-]', '_', ticker.upper())
+
+@contextmanager
+def atomic_path(path):
+    """Yields a temporary path to write to, then moves it over `path` in one step.
+
+    The temporary name includes the process and thread id: Streamlit sessions are threads of one
+    process, so two sessions writing the same file must not share a temporary file.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
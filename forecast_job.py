@@ -0,0 +1,89 @@
+"""Overnight batch job that precomputes 30-day forecasts for every tracked ticker.
+
+Forecasts every ticker in any user's watchlist or portfolio, one ticker per worker process,
+and stores the results in the forecasts table for Stock_Prediction to serve. Run from the
+repository root, e.g. nightly from cron:
+
+    python -m pages.utils.forecast_job
+    python -m pages.utils.forecast_job --backends arima-auto ar --workers 4
+    python -m pages.utils.forecast_job --backends arima   # the slow (30,d,30) fit, off by default
+    python -m pages.utils.forecast_job --tickers AAPL MSFT
+"""
+import sys
+import time
+import argparse
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from joblib import parallel_config
+
+from pages.utils.model_train import get_data, get_rolling_mean, forecast_prices, BACKENDS, BATCH_BACKENDS
+from pages.utils.model_cache import use_batch_cache
+import db_manager
+
+DEFAULT_BACKENDS = BATCH_BACKENDS
+
+def _forecast_ticker(ticker, backends):
+    """Runs every backend for one ticker; returns a list of result dicts (one per backend)."""
+    results = []
+    try:
+        rolling_price = get_rolling_mean(get_data(ticker))
+    except Exception as e:
+        return [{'ticker': ticker, 'backend': backend, 'error': f"no data: {e}"} for backend in backends]
+    data_end = rolling_price.index[-1].strftime('%Y-%m-%d') if len(rolling_price) else None
+    for backend in backends:
+        start = time.perf_counter()
+        try:
+            # Each worker already has a core; keep the order search inside it sequential.
+            with parallel_config(backend='sequential'):
+                forecast, rmse, metadata = forecast_prices(rolling_price, ticker, backend)
+        except Exception as e:
+            results.append({'ticker': ticker, 'backend': backend, 'error': str(e),
+                            'seconds': time.perf_counter() - start})
+            continue
+        results.append({'ticker': ticker, 'backend': backend, 'forecast': forecast, 'rmse': rmse,
+                        'metadata': metadata, 'data_end': data_end, 'seconds': time.perf_counter() - start})
+    return results
+
+def run_forecast_job(tickers=None, backends=DEFAULT_BACKENDS, max_workers=None):
+    """Forecasts `tickers` (default: every tracked ticker) and stores the results.
+
+    Workers only compute; all database writes happen in this process, so SQLite sees a single writer.
+    Returns a summary DataFrame with one row per (ticker, backend).
+    """
+    db_manager.create_tables()
+    tickers = tickers or db_manager.get_tracked_tickers()
+    rows = []
+    # Workers cache their fits apart from the pages' cache: about four fits per ticker would
+    # otherwise push every fit the pages use out of its MAX_ENTRIES.
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=use_batch_cache) as pool:
+        futures = [pool.submit(_forecast_ticker, ticker, backends) for ticker in tickers]
+        for future in as_completed(futures):
+            for result in future.result():
+                if 'forecast' in result:
+                    db_manager.save_forecast(result['ticker'], result['backend'], result['forecast'],
+                                             result['rmse'], result['metadata'], result['data_end'])
+                rows.append({
+                    'ticker': result['ticker'], 'backend': result['backend'], 'rmse': result.get('rmse'),
+                    'seconds': round(result.get('seconds', 0.0), 2), 'error': result.get('error'),
+                })
+    return pd.DataFrame(rows, columns=['ticker', 'backend', 'rmse', 'seconds', 'error'])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tickers', nargs='+', help='forecast only these tickers')
+    parser.add_argument('--backends', nargs='+', default=DEFAULT_BACKENDS, choices=BACKENDS)
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per core)')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    summary = run_forecast_job(args.tickers, args.backends, args.workers)
+    if summary.empty:
+        print("No tickers in any watchlist or portfolio.")
+        return 0
+    print(summary.sort_values(['ticker', 'backend']).to_string(index=False))
+    failed = summary['error'].notna().sum()
+    print(f"{len(summary) - failed} forecasts stored, {failed} failed, in {time.perf_counter() - start:.1f} s.")
+    return 1 if failed == len(summary) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
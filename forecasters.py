@@ -0,0 +1,78 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Lightweight NumPy forecasters. Each takes (data, differencing_order, steps) and returns
+# `steps` predictions, the same contract as model_train.fit_model for the ARIMA backend.
+
+def _difference(values, differencing_order):
+    """Differences the series d times, remembering the last value at each level to undo it."""
+    last_values = []
+    for _ in range(differencing_order):
+        last_values.append(values[-1])
+        values = np.diff(values)
+    return values, last_values
+
+def _integrate(forecast, last_values):
+    """Reverses _difference on a forecast of the differenced series."""
+    for last in reversed(last_values):
+        forecast = last + np.cumsum(forecast)
+    return forecast
+
+def ar_forecast(data, differencing_order, steps=30, lags=10):
+    """Least-squares AR(lags) with intercept on the differenced series."""
+    values, last_values = _difference(np.asarray(data, dtype=float).ravel(), differencing_order)
+    lags = max(1, min(lags, len(values) // 3))
+    windows = sliding_window_view(values, lags + 1)
+    X = np.column_stack([np.ones(len(windows)), windows[:, :-1]])
+    coef = np.linalg.lstsq(X, windows[:, -1], rcond=None)[0]
+
+    history = list(values[-lags:])
+    forecast = np.empty(steps)
+    for h in range(steps):
+        forecast[h] = coef[0] + np.dot(coef[1:], history[-lags:])
+        history.append(forecast[h])
+    return _integrate(forecast, last_values)
+
+def ets_forecast(data, differencing_order, steps=30):
+    """Damped-trend Holt exponential smoothing, with alpha/beta/phi picked by one-step SSE over a grid.
+
+    The trend term already absorbs non-stationarity, so the differencing order is not used.
+    """
+    values = np.asarray(data, dtype=float).ravel()
+    alphas, betas, phis = np.meshgrid(np.linspace(0.05, 0.95, 19), np.linspace(0.01, 0.5, 10),
+                                      np.array([0.8, 0.9, 0.95, 0.98, 1.0]))
+    alphas, betas, phis = alphas.ravel(), betas.ravel(), phis.ravel()
+
+    # Run every parameter combination at once; the loop is over time only.
+    level = np.full(alphas.shape, values[0])
+    trend = np.full(alphas.shape, values[1] - values[0] if len(values) > 1 else 0.0)
+    sse = np.zeros(alphas.shape)
+    for y in values[1:]:
+        damped_trend = phis * trend
+        error = y - (level + damped_trend)
+        sse += error ** 2
+        new_level = alphas * y + (1 - alphas) * (level + damped_trend)
+        trend = betas * (new_level - level) + (1 - betas) * damped_trend
+        level = new_level
+
+    best = np.argmin(sse)
+    damping = np.cumsum(phis[best] ** np.arange(1, steps + 1))
+    return level[best] + trend[best] * damping
+
+def drift_forecast(data, differencing_order, steps=30):
+    """Random walk with drift: extends the average change between the first and last value."""
+    values = np.asarray(data, dtype=float).ravel()
+    drift = (values[-1] - values[0]) / (len(values) - 1) if len(values) > 1 else 0.0
+    return values[-1] + drift * np.arange(1, steps + 1)
+
+def naive_forecast(data, differencing_order, steps=30):
+    """Repeats the last observed value."""
+    values = np.asarray(data, dtype=float).ravel()
+    return np.full(steps, values[-1])
+
+FAST_FORECASTERS = {
+    'ar': ar_forecast,
+    'ets': ets_forecast,
+    'drift': drift_forecast,
+    'naive': naive_forecast,
+}
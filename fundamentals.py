@@ -0,0 +1,66 @@
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+import yfinance as yf
+from pages.utils.instrumentation import timed
+from pages.utils.file_store import ticker_key, atomic_path
+
+CACHE_DIR = os.path.join("cache", "fundamentals")
+TTL_SECONDS = 24 * 60 * 60
+# The stock.info fields shown on Stock_Analysis; the rest of the (large) payload is not kept.
+FIELDS = [
+    'longBusinessSummary', 'sector', 'fullTimeEmployees', 'website',
+    'marketCap', 'beta', 'trailingEps', 'trailingPE',
+    'quickRatio', 'revenuePerShare', 'profitMargins', 'debtToEquity', 'returnOnEquity',
+]
+
+def _cache_path(ticker):
+    return os.path.join(CACHE_DIR, f"{ticker_key(ticker)}.json")
+
+def _read_cached(ticker):
+    """Returns the cached fields if they are younger than TTL_SECONDS, else None."""
+    try:
+        with open(_cache_path(ticker)) as f:
+            entry = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if time.time() - entry['fetched_at'] > TTL_SECONDS:
+        return None
+    return entry['fields']
+
+@timed('fetch')
+def _fetch(ticker):
+    """Downloads the info payload once and writes the fields the page uses to disk."""
+    info = yf.Ticker(ticker).info
+    fields = {field: info.get(field) for field in FIELDS}
+    with atomic_path(_cache_path(ticker)) as tmp_path:
+        with open(tmp_path, 'w') as f:
+            json.dump({'fetched_at': time.time(), 'fields': fields}, f)
+    return fields
+
+def get_fundamentals(ticker):
+    """Returns {field: value} for FIELDS, fetching from Yahoo at most once per TTL_SECONDS."""
+    fields = _read_cached(ticker)
+    if fields is None:
+        fields = _fetch(ticker)
+    return fields
+
+def warm_fundamentals(tickers, max_workers=8):
+    """Fetches every ticker whose cache entry is missing or expired, in parallel.
+
+    Returns {ticker: fields}; tickers whose fetch failed map to None.
+    """
+    results = {ticker: _read_cached(ticker) for ticker in tickers}
+    stale = [ticker for ticker, fields in results.items() if fields is None]
+
+    def fetch(ticker):
+        try:
+            return _fetch(ticker)
+        except Exception:
+            return None
+
+    if stale:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results.update(zip(stale, pool.map(fetch, stale)))
+    return results
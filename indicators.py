@@ -0,0 +1,183 @@
+import threading
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+from cachetools import LRUCache
+from pages.utils.instrumentation import timed
+
+# Same parameters as the pandas_ta defaults the charts used before.
+RSI_LENGTH = 14
+SMA_LENGTH = 50
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+INDICATOR_COLUMNS = ['RSI', f'SMA_{SMA_LENGTH}', f'EMA_{MACD_FAST}', f'EMA_{MACD_SLOW}', 'MACD', 'MACD Signal', 'MACD Hist']
+# Below this many bars the warm-up windows are not complete yet, so we always recompute in full.
+MIN_INCREMENTAL_BARS = MACD_SLOW + MACD_SIGNAL
+
+_cache = LRUCache(maxsize=64)
+_cache_lock = threading.Lock()
+
+def _ewm(values, alpha, prev):
+    """The adjust=False EWM recursion y[t] = alpha*x[t] + (1-alpha)*y[t-1], continuing from `prev`."""
+    if len(values) == 0:
+        return values
+    out, _ = lfilter([alpha], [1, alpha - 1], values, zi=[(1 - alpha) * prev])
+    return out
+
+def _seeded_ema(values, length):
+    """pandas_ta's EMA: NaN during warm-up, seeded with the SMA of the first `length` values."""
+    out = np.full(len(values), np.nan)
+    if len(values) >= length:
+        seed = values[:length].mean()
+        out[length - 1] = seed
+        out[length:] = _ewm(values[length:], 2 / (length + 1), seed)
+    return out
+
+def _sma(values, length):
+    out = np.full(len(values), np.nan)
+    if len(values) >= length:
+        cumsum = np.concatenate([[0.0], np.cumsum(values)])
+        out[length - 1:] = (cumsum[length:] - cumsum[:-length]) / length
+    return out
+
+def _rsi(pos_avg, neg_avg):
+    return 100 * pos_avg / (pos_avg + np.abs(neg_avg))
+
+def _compute_full(close):
+    """Computes every indicator over the whole series and the state needed to extend it later."""
+    n = len(close)
+    diff = np.diff(close)
+    pos_avg = np.full(n, np.nan)
+    neg_avg = np.full(n, np.nan)
+    if n > 1:
+        alpha = 1 / RSI_LENGTH
+        pos_avg[1] = max(diff[0], 0)
+        neg_avg[1] = min(diff[0], 0)
+        pos_avg[2:] = _ewm(np.maximum(diff[1:], 0), alpha, pos_avg[1])
+        neg_avg[2:] = _ewm(np.minimum(diff[1:], 0), alpha, neg_avg[1])
+
+    ema_fast = _seeded_ema(close, MACD_FAST)
+    ema_slow = _seeded_ema(close, MACD_SLOW)
+    macd = ema_fast - ema_slow
+    signal = np.full(n, np.nan)
+    if n >= MACD_SLOW:
+        signal[MACD_SLOW - 1:] = _seeded_ema(macd[MACD_SLOW - 1:], MACD_SIGNAL)
+
+    columns = {
+        'RSI': _rsi(pos_avg, neg_avg),
+        f'SMA_{SMA_LENGTH}': _sma(close, SMA_LENGTH),
+        f'EMA_{MACD_FAST}': ema_fast,
+        f'EMA_{MACD_SLOW}': ema_slow,
+        'MACD': macd,
+        'MACD Signal': signal,
+        'MACD Hist': macd - signal,
+    }
+    return columns, (pos_avg, neg_avg, ema_fast, ema_slow, signal)
+
+def _state_at(close, recursions, i):
+    """Everything needed to continue the indicators from bar i + 1."""
+    pos_avg, neg_avg, ema_fast, ema_slow, signal = recursions
+    return {
+        'close': close[i],
+        'pos_avg': pos_avg[i],
+        'neg_avg': neg_avg[i],
+        'ema_fast': ema_fast[i],
+        'ema_slow': ema_slow[i],
+        'signal': signal[i],
+        'sma_window': close[max(0, i - SMA_LENGTH + 2):i + 1],
+    }
+
+def _extend(state, new_close):
+    """Continues the indicators over the new bars only, starting from a saved state."""
+    diff = np.diff(np.concatenate([[state['close']], new_close]))
+    alpha = 1 / RSI_LENGTH
+    pos_avg = _ewm(np.maximum(diff, 0), alpha, state['pos_avg'])
+    neg_avg = _ewm(np.minimum(diff, 0), alpha, state['neg_avg'])
+    ema_fast = _ewm(new_close, 2 / (MACD_FAST + 1), state['ema_fast'])
+    ema_slow = _ewm(new_close, 2 / (MACD_SLOW + 1), state['ema_slow'])
+    macd = ema_fast - ema_slow
+    signal = _ewm(macd, 2 / (MACD_SIGNAL + 1), state['signal'])
+    window = np.concatenate([state['sma_window'], new_close])
+    sma = _sma(window, SMA_LENGTH)[-len(new_close):]
+
+    columns = {
+        'RSI': _rsi(pos_avg, neg_avg),
+        f'SMA_{SMA_LENGTH}': sma,
+        f'EMA_{MACD_FAST}': ema_fast,
+        f'EMA_{MACD_SLOW}': ema_slow,
+        'MACD': macd,
+        'MACD Signal': signal,
+        'MACD Hist': macd - signal,
+    }
+    return columns, (pos_avg, neg_avg, ema_fast, ema_slow, signal), window
+
+def compute_indicators(dataframe):
+    """Returns RSI, SMA, EMA and MACD columns for the frame's Close prices without modifying the frame."""
+    close = dataframe['Close'].to_numpy(dtype=float)
+    columns, _ = _compute_full(close)
+    return pd.DataFrame(columns, index=dataframe.index)
+
+def indicator_panel(closes, names=INDICATOR_COLUMNS):
+    """Indicators for every column of a close-price panel (dates x tickers).
+
+    Returns {name: DataFrame shaped like `closes`}. Leading NaNs (tickers listed after the panel
+    starts) are skipped, so each column matches compute_indicators on that ticker's own history.
+    """
+    values = closes.to_numpy(dtype=float)
+    out = {name: np.full(values.shape, np.nan) for name in names}
+    for j in range(values.shape[1]):
+        valid = np.flatnonzero(~np.isnan(values[:, j]))
+        if len(valid) == 0:
+            continue
+        first = valid[0]
+        columns, _ = _compute_full(pd.Series(values[first:, j]).ffill().to_numpy())
+        for name in names:
+            out[name][first:, j] = columns[name]
+    return {name: pd.DataFrame(out[name], index=closes.index, columns=closes.columns) for name in names}
+
+def _can_extend(entry, index, close):
+    # The cached bars must be a prefix of the new data. The last cached bar may have been a partial bar,
+    # so it is recomputed and only the bar before it has to match.
+    m = len(entry['index'])
+    return (m >= MIN_INCREMENTAL_BARS and len(index) >= m
+            and index[0] == entry['index'][0]
+            and index[m - 2] == entry['index'][m - 2]
+            and close[m - 2] == entry['state']['close'])
+
+@timed('compute')
+def get_indicators(dataframe, ticker=None):
+    """Indicator frame for `dataframe`, cached per ticker and extended over new bars instead of recomputed.
+
+    Without a ticker the indicators are computed directly and nothing is cached.
+    """
+    if ticker is None:
+        return compute_indicators(dataframe)
+
+    index = dataframe.index
+    close = dataframe['Close'].to_numpy(dtype=float)
+    key = ticker.upper()
+    with _cache_lock:
+        entry = _cache.get(key)
+
+    if entry is not None and len(entry['index']) == len(index) and index[-1] == entry['index'][-1] \
+            and close[-1] == entry['last_close']:
+        return entry['result']
+
+    if entry is not None and _can_extend(entry, index, close):
+        m = len(entry['index'])
+        new_close = close[m - 1:]
+        columns, recursions, window = _extend(entry['state'], new_close)
+        tail = pd.DataFrame(columns, index=index[m - 1:])
+        result = pd.concat([entry['result'].iloc[:m - 1], tail])
+        state = _state_at(new_close, recursions, len(new_close) - 2) if len(new_close) > 1 else entry['state']
+        if len(new_close) > 1:
+            state['sma_window'] = window[max(0, len(window) - SMA_LENGTH):-1]
+    else:
+        columns, recursions = _compute_full(close)
+        result = pd.DataFrame(columns, index=index)
+        state = _state_at(close, recursions, len(close) - 2) if len(close) > 1 else None
+
+    result.index.name = index.name
+    if state is not None:
+        with _cache_lock:
+            _cache[key] = {'index': index, 'last_close': close[-1], 'result': result, 'state': state}
+    return result
@@ -0,0 +1,218 @@
+import os
+import json
+import time
+import threading
+import functools
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pages.utils.file_store import atomic_path
+
+try:
+    from streamlit.runtime import exists as runtime_exists, get_instance as get_runtime
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+except ImportError:  # batch jobs and benchmarks run without Streamlit
+    runtime_exists = get_runtime = get_script_run_ctx = None
+
+METRICS_FILE = os.path.join("cache", "metrics.json")
+# Set this to a port number to serve Prometheus text metrics at http://host:port/metrics.
+METRICS_PORT_ENV = "TRADING_APP_METRICS_PORT"
+# The /metrics server only listens on this machine unless this names another interface (e.g. 0.0.0.0).
+METRICS_HOST_ENV = "TRADING_APP_METRICS_HOST"
+DEFAULT_METRICS_HOST = "127.0.0.1"
+# Set this to 1 (or open a page with ?debug=1) to show the timing panel at the bottom of each page.
+DEBUG_PANEL_ENV = "TRADING_APP_DEBUG_PANEL"
+# Spans recorded outside a Streamlit script thread (worker pools, batch jobs).
+BACKGROUND_SESSION = "background"
+MAX_SPANS_PER_RUN = 1000
+# Per-session totals and spans are dropped once the session has ended or been idle this long.
+SESSION_IDLE_SECONDS = 3600
+
+def _new_totals():
+    return {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0}
+
+_lock = threading.Lock()
+# Process-wide totals per (stage, name); these are what /metrics serves and never shrink.
+_totals = defaultdict(_new_totals)
+# Per-session detail for the JSON export and the debug panel, bounded by _evict_sessions().
+_session_totals = defaultdict(_new_totals)
+_current_run = defaultdict(list)
+_last_seen = {}
+_server = None
+# Set once starting the server has failed, so later reruns do not try to bind again.
+_server_failed = False
+
+def current_session_id():
+    """The Streamlit session running on this thread, or BACKGROUND_SESSION."""
+    if get_script_run_ctx is None:
+        return BACKGROUND_SESSION
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else BACKGROUND_SESSION
+
+def _session_ended(session):
+    """True when Streamlit no longer knows the session (its browser tab was closed)."""
+    if session == BACKGROUND_SESSION or runtime_exists is None or not runtime_exists():
+        return False
+    return not get_runtime().is_active_session(session)
+
+def _evict_sessions(max_idle=SESSION_IDLE_SECONDS):
+    """Drops the per-session data of sessions that have ended or been idle for max_idle seconds."""
+    cutoff = time.time() - max_idle
+    with _lock:
+        sessions = list(_last_seen.items())
+    stale = {session for session, last_seen in sessions
+             if session != BACKGROUND_SESSION and (last_seen < cutoff or _session_ended(session))}
+    if not stale:
+        return
+    with _lock:
+        for session in stale:
+            _last_seen.pop(session, None)
+            _current_run.pop(session, None)
+        for key in [key for key in _session_totals if key[0] in stale]:
+            del _session_totals[key]
+
+def record(stage, name, seconds):
+    """Adds one timed call to the process and session totals and to the current rerun's span list."""
+    session = current_session_id()
+    with _lock:
+        _last_seen[session] = time.time()
+        for totals in (_totals[(stage, name)], _session_totals[(session, stage, name)]):
+            totals['count'] += 1
+            totals['seconds'] += seconds
+            totals['max_seconds'] = max(totals['max_seconds'], seconds)
+        spans = _current_run[session]
+        if len(spans) < MAX_SPANS_PER_RUN:
+            spans.append((stage, name, seconds))
+
+@contextmanager
+def span(stage, name):
+    """Times the enclosed block, e.g. `with span('fetch', 'yf.download'): ...`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, name, time.perf_counter() - start)
+
+def timed(stage, name=None):
+    """Decorator form of span(); the name defaults to module.function."""
+    def decorator(func):
+        span_name = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage, span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def snapshot():
+    """Per-session totals as a list of dicts: session, stage, name, count, seconds, max_seconds."""
+    with _lock:
+        return [dict(session=session, stage=stage, name=name, **totals)
+                for (session, stage, name), totals in _session_totals.items()]
+
+def process_totals():
+    """Totals summed over every session as a list of dicts: stage, name, count, seconds, max_seconds."""
+    with _lock:
+        return [dict(stage=stage, name=name, **totals) for (stage, name), totals in _totals.items()]
+
+def current_run_spans(session=None):
+    """(stage, name, seconds) for every span recorded since begin_run() in this session."""
+    with _lock:
+        return list(_current_run.get(session or current_session_id(), []))
+
+def export_metrics(path=METRICS_FILE):
+    """Writes the process-wide and per-session totals to a local JSON file."""
+    with atomic_path(path) as tmp_path:
+        with open(tmp_path, 'w') as f:
+            json.dump({'generated_at': time.time(), 'totals': process_totals(), 'spans': snapshot()}, f, indent=2)
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+def prometheus_text():
+    """The process-wide totals in the Prometheus text exposition format, labelled by stage and name only."""
+    metrics = [
+        ('trading_app_span_calls_total', 'counter', 'Number of timed calls.', 'count'),
+        ('trading_app_span_seconds_total', 'counter', 'Total seconds spent in timed calls.', 'seconds'),
+        ('trading_app_span_max_seconds', 'gauge', 'Slowest single timed call.', 'max_seconds'),
+    ]
+    rows = process_totals()
+    lines = []
+    for metric, metric_type, help_text, field in metrics:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {metric_type}")
+        for row in rows:
+            labels = f'stage="{_label(row["stage"])}",name="{_label(row["name"])}"'
+            lines.append(f"{metric}{{{labels}}} {row[field]}")
+    return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port, host=None):
+    """Serves /metrics on a daemon thread; only the first call in a process starts a server."""
+    global _server
+    host = host or os.environ.get(METRICS_HOST_ENV, DEFAULT_METRICS_HOST)
+    with _lock:
+        if _server is not None:
+            return _server
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
+
+def begin_run():
+    """Call at the top of a page: starts a fresh span list for this rerun and evicts stale sessions."""
+    global _server_failed
+    session = current_session_id()
+    with _lock:
+        _current_run[session] = []
+        _last_seen[session] = time.time()
+    _evict_sessions()
+    port = os.environ.get(METRICS_PORT_ENV)
+    if port and _server is None and not _server_failed:
+        try:
+            start_metrics_server(int(port))
+        except OSError:
+            _server_failed = True  # another process already serves the port
+
+def debug_panel_enabled():
+    if os.environ.get(DEBUG_PANEL_ENV) == '1':
+        return True
+    import streamlit as st
+    return st.query_params.get('debug') == '1'
+
+def render_debug_panel():
+    """Shows the timing breakdown of the current rerun, grouped by stage."""
+    import streamlit as st
+    import pandas as pd
+    spans = pd.DataFrame(current_run_spans(), columns=['Stage', 'Name', 'Seconds'])
+    with st.expander("⏱️ Timing breakdown (this rerun)"):
+        if spans.empty:
+            st.write("No timed calls in this rerun.")
+            return
+        by_stage = spans.groupby('Stage')['Seconds'].agg(['count', 'sum']).sort_values('sum', ascending=False)
+        st.dataframe(by_stage.rename(columns={'count': 'Calls', 'sum': 'Seconds'}), use_container_width=True)
+        by_name = spans.groupby(['Stage', 'Name'])['Seconds'].agg(['count', 'sum']).sort_values('sum', ascending=False)
+        st.dataframe(by_name.rename(columns={'count': 'Calls', 'sum': 'Seconds'}), use_container_width=True)
+
+def finish_run():
+    """Call at the end of a page: exports the metrics file and shows the debug panel if enabled."""
+    try:
+        export_metrics()
+    except OSError:
+        pass
+    if debug_panel_enabled():
+        render_debug_panel()
@@ -0,0 +1,79 @@
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import pandas_datareader.data as web
+from pages.utils.price_store import get_prices
+from pages.utils.series_align import normalize_daily_index
+from pages.utils.instrumentation import timed
+
+MAX_WORKERS = 8
+RETRIES = 3
+BACKOFF_SECONDS = 0.5
+
+class PriceProvider(ABC):
+    """Where the CAPM pages get their data from. Subclasses return pandas Series indexed by date."""
+
+    @abstractmethod
+    def fetch_close(self, ticker, start, end):
+        """Daily close prices for one ticker."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def fetch_fred(self, series_id, start, end):
+        """One FRED series, e.g. 'sp500'."""
+        raise NotImplementedError
+
+class LiveProvider(PriceProvider):
+    """Yahoo prices through the local price store, and FRED through pandas_datareader."""
+
+    def fetch_close(self, ticker, start, end):
+        return get_prices(ticker, start=start, end=end)['Close']
+
+    def fetch_fred(self, series_id, start, end):
+        return web.DataReader([series_id], 'fred', start, end)[series_id]
+
+class FixtureProvider(PriceProvider):
+    """Serves pre-built Series from memory, for tests and offline runs."""
+
+    def __init__(self, closes, fred):
+        self.closes = closes
+        self.fred = fred
+
+    @staticmethod
+    def _between(series, start, end):
+        # Fixtures may be in Yahoo's tz-aware shape; compare on local calendar dates like the price store.
+        series = series.set_axis(normalize_daily_index(series.index))
+        return series.loc[pd.Timestamp(start):pd.Timestamp(end)]
+
+    def fetch_close(self, ticker, start, end):
+        return self._between(self.closes[ticker], start, end)
+
+    def fetch_fred(self, series_id, start, end):
+        return self._between(self.fred[series_id], start, end)
+
+def _with_retries(fetch, *args, retries=RETRIES):
+    """Calls fetch(*args), retrying with exponential backoff; the last error is re-raised."""
+    for attempt in range(retries):
+        try:
+            return fetch(*args)
+        except Exception:
+            if attempt == retries - 1:
+                raise
+            time.sleep(BACKOFF_SECONDS * 2 ** attempt)
+
+@timed('fetch')
+def fetch_capm_data(stocks, start, end, provider=None, max_workers=MAX_WORKERS, retries=RETRIES):
+    """Fetches the S&P 500 from FRED and every stock's closes concurrently.
+
+    Returns (closes, sp500): a DataFrame with one close column per stock, and a one-column 'sp500' DataFrame.
+    """
+    provider = provider or LiveProvider()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        sp500_future = pool.submit(_with_retries, provider.fetch_fred, 'sp500', start, end, retries=retries)
+        close_futures = {stock: pool.submit(_with_retries, provider.fetch_close, stock, start, end, retries=retries)
+                         for stock in stocks}
+        closes = pd.DataFrame({stock: future.result() for stock, future in close_futures.items()})
+        closes.index.name = 'Date'
+        sp500 = sp500_future.result().to_frame('sp500')
+    return closes, sp500
@@ -0,0 +1,158 @@
+import os
+import glob
+import json
+import time
+import pickle
+import hashlib
+import numpy as np
+from pages.utils.file_store import ticker_key, atomic_path
+
+CACHE_DIR = os.path.join("cache", "models")
+# The nightly forecast job keeps its fits here, so its runs do not evict the fits the pages use.
+BATCH_CACHE_DIR = os.path.join("cache", "models_batch")
+SCALERS_DIR = os.path.join("cache", "scalers")
+ORDERS_DIR = os.path.join("cache", "arima_orders")
+MAX_ENTRIES = 32
+# A cached fit is extended in place (same parameters) by up to this many bars past the data it was
+# estimated on: the 30-day holdout, so the forecast fit is the evaluation fit plus the test bars, and
+# about a week of new daily bars. Beyond that the parameters are re-estimated.
+MAX_APPEND_BARS = 35
+# A remembered best ARIMA order is reused for this long before the grid is searched again.
+ORDER_TTL_SECONDS = 7 * 24 * 60 * 60
+
+def fingerprint(data):
+    """Short hash of the series values, used to tell whether a cached fit matches the data."""
+    values = np.ascontiguousarray(np.asarray(data, dtype=float).ravel())
+    return hashlib.sha1(values.tobytes()).hexdigest()[:16]
+
+def _key_prefix(ticker, order):
+    return f"{ticker_key(ticker)}_{'-'.join(str(i) for i in order)}_"
+
+def _entry_path(ticker, order, data_fingerprint):
+    return os.path.join(CACHE_DIR, f"{_key_prefix(ticker, order)}{data_fingerprint}.pkl")
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+def _mtime(path):
+    # Another session or worker may evict the file between the glob and this call.
+    try:
+        return os.path.getmtime(path)
+    except FileNotFoundError:
+        return 0.0
+
+def _touch(path):
+    # The file mtime doubles as the "last used" time for LRU eviction.
+    os.utime(path, None)
+
+def _evict():
+    """Removes the least recently used fits until at most MAX_ENTRIES remain."""
+    paths = sorted(glob.glob(os.path.join(CACHE_DIR, "*.pkl")), key=_mtime)
+    for path in paths[:max(0, len(paths) - MAX_ENTRIES)]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def save_model(ticker, data, order, model_fit):
+    """Stores a fitted statsmodels results object for (ticker, data, order)."""
+    with atomic_path(_entry_path(ticker, order, fingerprint(data))) as tmp_path:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(model_fit, f, protocol=pickle.HIGHEST_PROTOCOL)
+    _evict()
+
+def _extend_cached(ticker, data, order):
+    """Finds a cached fit on a prefix of `data` and appends the new bars to it without refitting.
+
+    This is how get_forecast reuses evaluate_model's fit on the first n - 30 bars.
+    """
+    values = np.asarray(data, dtype=float).ravel()
+    paths = sorted(glob.glob(os.path.join(CACHE_DIR, f"{glob.escape(_key_prefix(ticker, order))}*.pkl")),
+                   key=_mtime, reverse=True)
+    for path in paths:
+        try:
+            model_fit = _read(path)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            # Evicted (or still being replaced) by another session or worker since the glob.
+            continue
+        cached = np.asarray(model_fit.model.endog, dtype=float).ravel()
+        # Count from the bars the parameters were estimated on, not from the last extension.
+        fitted_nobs = getattr(model_fit, 'fitted_nobs', len(cached))
+        if (len(cached) < len(values) and len(values) - fitted_nobs <= MAX_APPEND_BARS
+                and np.array_equal(cached, values[:len(cached)])):
+            extended = model_fit.append(np.asarray(data)[len(cached):], refit=False)
+            extended.fitted_nobs = fitted_nobs
+            return extended
+    return None
+
+def load_model(ticker, data, order):
+    """Returns a fitted model for (ticker, data, order) from the cache, or None on a miss."""
+    path = _entry_path(ticker, order, fingerprint(data))
+    try:
+        model_fit = _read(path)
+        _touch(path)
+        return model_fit
+    except FileNotFoundError:
+        pass
+    if not os.path.isdir(CACHE_DIR):
+        return None
+    model_fit = _extend_cached(ticker, data, order)
+    if model_fit is not None:
+        save_model(ticker, data, order, model_fit)
+    return model_fit
+
+def use_batch_cache():
+    """Points this process at BATCH_CACHE_DIR; the forecast job calls it in each worker."""
+    global CACHE_DIR
+    CACHE_DIR = BATCH_CACHE_DIR
+
+def clear_models():
+    """Deletes every cached fit."""
+    for path in glob.glob(os.path.join(CACHE_DIR, "*.pkl")):
+        os.remove(path)
+
+def _order_path(ticker, criterion):
+    return os.path.join(ORDERS_DIR, f"{ticker_key(ticker)}_{criterion}.json")
+
+def load_best_order(ticker, criterion):
+    """Returns the remembered (p, d, q) for a ticker and criterion, or None if missing or expired."""
+    try:
+        with open(_order_path(ticker, criterion)) as f:
+            entry = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if time.time() - entry['searched_at'] > ORDER_TTL_SECONDS:
+        return None
+    return tuple(entry['order'])
+
+def save_best_order(ticker, criterion, order, score):
+    """Remembers the winning order of an order search."""
+    with atomic_path(_order_path(ticker, criterion)) as tmp_path:
+        with open(tmp_path, 'w') as f:
+            json.dump({'searched_at': time.time(), 'order': list(order), 'score': score}, f)
+
+def _scaler_path(ticker):
+    return os.path.join(SCALERS_DIR, f"{ticker_key(ticker)}.pkl")
+
+def load_scaler(ticker, data):
+    """Returns the scaler stored for a ticker if it was fitted on a prefix of `data`, else None.
+
+    Reusing it keeps yesterday's scaled values unchanged today, so cached fits still match.
+    """
+    try:
+        entry = _read(_scaler_path(ticker))
+    except (FileNotFoundError, pickle.UnpicklingError, EOFError):
+        return None
+    values = np.asarray(data, dtype=float).ravel()
+    if len(values) < entry['n'] or fingerprint(values[:entry['n']]) != entry['fingerprint']:
+        return None
+    return entry['scaler']
+
+def save_scaler(ticker, data, scaler):
+    """Stores the scaler fitted on `data` for a ticker."""
+    values = np.asarray(data, dtype=float).ravel()
+    with atomic_path(_scaler_path(ticker)) as tmp_path:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'n': len(values), 'fingerprint': fingerprint(values), 'scaler': scaler}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
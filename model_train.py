@@ -1,14 +1,44 @@
-import yfinance as yf
 from statsmodels.tsa.stattools import adfuller
 from sklearn.metrics import mean_squared_error, r2_score
 from statsmodels.tsa.arima.model import ARIMA
 import numpy as np
 from sklearn.preprocessing import StandardScaler
 from datetime import datetime,timedelta
+import time
+import warnings
 import pandas as pd
+from joblib import Parallel, delayed
+from pages.utils.price_store import get_prices
+from pages.utils.model_cache import load_model, save_model, load_best_order, save_best_order, load_scaler, save_scaler
+from pages.utils.forecasters import FAST_FORECASTERS
+from pages.utils.instrumentation import timed
+
+# 'arima' is the full (30,d,30) statsmodels fit, 'arima-auto' an ARIMA with a searched order;
+# the rest are the sub-second NumPy forecasters.
+BACKENDS=['arima','arima-auto']+list(FAST_FORECASTERS)
+# Stock_Prediction's model choices (in display order) and the one it selects by default.
+BACKEND_LABELS={
+    'Fast - AR (least squares)':'ar',
+    'Fast - Exponential Smoothing':'ets',
+    'Fast - Drift':'drift',
+    'Auto - ARIMA (searched order)':'arima-auto',
+    'Full - ARIMA (30,d,30)':'arima',
+}
+DEFAULT_BACKEND='ar'
+# What the nightly forecast job precomputes unless told otherwise: the full (30,d,30) ARIMA takes
+# tens of seconds per ticker and is not the page default, so it is only run with --backends arima.
+BATCH_BACKENDS=[backend for backend in BACKENDS if backend!='arima']
+
+# Order search: candidates are scored one complexity level (p+q) at a time, and the search stops
+# once SEARCH_PATIENCE levels in a row fail to beat the best score so far.
+SEARCH_P=range(0,6)
+SEARCH_Q=range(0,6)
+SEARCH_CRITERIA=['aic','bic','rmse']
+SEARCH_PATIENCE=2
+HOLDOUT_DAYS=30
 
 def get_data(ticker):
-    stock_data=yf.download(ticker, start='2024-01-01')
+    stock_data=get_prices(ticker, start='2024-01-01')
     return stock_data[['Close']]
 
 def stationary_check(close_price):
@@ -20,6 +50,7 @@ def get_rolling_mean(close_price):
     rolling_price=close_price.rolling(window=7).mean().dropna()
     return rolling_price
 
+@timed('compute')
 def get_differencing_order(close_price):
     p_value=stationary_check(close_price)
     d=0
@@ -32,29 +63,168 @@ def get_differencing_order(close_price):
             break
     return d
 
-def fit_model(data,differencing_order):
-    model=ARIMA(data,order=(30,differencing_order,30))
-    model_fit=model.fit()
+def _score_order(data,order,criterion):
+    """Scores one candidate; a fit that fails to converge or errors out scores infinity."""
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            if criterion=='rmse':
+                train_data,test_data=data[:-HOLDOUT_DAYS],data[-HOLDOUT_DAYS:]
+                predictions=ARIMA(train_data,order=order).fit().forecast(steps=HOLDOUT_DAYS)
+                return float(np.sqrt(mean_squared_error(test_data,predictions)))
+            model_fit=ARIMA(data,order=order).fit()
+            return float(model_fit.aic if criterion=='aic' else model_fit.bic)
+    except Exception:
+        return np.inf
+
+@timed('compute')
+def search_order(data,differencing_order,criterion='aic',n_jobs=-1):
+    """Grid-searches (p,d,q) in parallel and returns (best order, DataFrame of every scored candidate).
+
+    AIC and BIC are likelihoods of differently differenced series when d changes, so they are only
+    compared at the ADF differencing order; the out-of-sample RMSE also tries the order above it
+    (at most 2). Lower scores are better for all criteria.
+    """
+    if criterion not in SEARCH_CRITERIA:
+        raise ValueError(f"criterion must be one of {SEARCH_CRITERIA}, got {criterion!r}")
+    d_values=[differencing_order]
+    if criterion=='rmse':
+        d_values=sorted({differencing_order,min(differencing_order+1,2)})
+    levels={}
+    for p in SEARCH_P:
+        for q in SEARCH_Q:
+            levels.setdefault(p+q,[]).extend((p,d,q) for d in d_values)
 
+    rows=[]
+    best_score=np.inf
+    levels_without_improvement=0
+    with Parallel(n_jobs=n_jobs) as parallel:
+        for level in sorted(levels):
+            scores=parallel(delayed(_score_order)(data,order,criterion) for order in levels[level])
+            rows.extend({'Order':order,'Score':score} for order,score in zip(levels[level],scores))
+            if min(scores)<best_score:
+                best_score=min(scores)
+                levels_without_improvement=0
+            else:
+                levels_without_improvement+=1
+                if levels_without_improvement>=SEARCH_PATIENCE:
+                    break
+    results=pd.DataFrame(rows).sort_values('Score').reset_index(drop=True)
+    if not np.isfinite(results['Score'].iloc[0]):
+        raise ValueError("No ARIMA order in the search grid could be fitted")
+    return tuple(results['Order'].iloc[0]),results
+
+def get_best_order(data,differencing_order,ticker=None,criterion='aic'):
+    """The searched order for the data, reusing the one remembered for the ticker when there is one."""
+    order=load_best_order(ticker,criterion) if ticker else None
+    if order is None:
+        order,results=search_order(data,differencing_order,criterion)
+        if ticker:
+            save_best_order(ticker,criterion,order,float(results['Score'].iloc[0]))
+    return order
+
+@timed('compute')
+def get_fitted_model(data,differencing_order,ticker=None,order=None):
+    order=order or (30,differencing_order,30)
+    model_fit=load_model(ticker,data,order) if ticker else None
+    if model_fit is None:
+        model=ARIMA(data,order=order)
+        model_fit=model.fit()
+        if ticker:
+            save_model(ticker,data,order,model_fit)
+    return model_fit
+
+@timed('compute')
+def fit_model(data,differencing_order,ticker=None,backend='arima'):
     forecast_steps=30
+    if backend not in ('arima','arima-auto'):
+        return FAST_FORECASTERS[backend](data,differencing_order,steps=forecast_steps)
+
+    order=get_best_order(data,differencing_order,ticker) if backend=='arima-auto' else None
+    model_fit=get_fitted_model(data,differencing_order,ticker,order)
     forecast=model_fit.get_forecast(steps=forecast_steps)
 
     predictions=forecast.predicted_mean
     return predictions
 
-def evaluate_model(original_price,differencing_order):
+def evaluate_model(original_price,differencing_order,ticker=None,backend='arima'):
     train_data, test_data=original_price[:-30], original_price[-30:]
-    predictions=fit_model(train_data,differencing_order)
+    predictions=fit_model(train_data,differencing_order,ticker,backend)
     rmse=np.sqrt(mean_squared_error(test_data,predictions))
     return round(rmse,2)
 
-def scaling(close_price):
-    scaler=StandardScaler()
-    scaled_data=scaler.fit_transform(np.array(close_price).reshape(-1,1))
+def _walk_forward_errors(original_price,differencing_order,ticker,backend,origins,horizon):
+    """Forecast errors (origins x horizon) from each origin; NaN where the horizon runs past the data."""
+    values=np.asarray(original_price,dtype=float).ravel()
+    errors=np.full((len(origins),horizon),np.nan)
+    if backend in ('arima','arima-auto'):
+        # Fit once at the first origin, then only filter the new observations into the state.
+        train_data=original_price[:origins[0]]
+        order=get_best_order(train_data,differencing_order,ticker) if backend=='arima-auto' else None
+        model_fit=get_fitted_model(train_data,differencing_order,ticker,order)
+    for i,origin in enumerate(origins):
+        if backend in ('arima','arima-auto'):
+            if i>0:
+                model_fit=model_fit.extend(original_price[origins[i-1]:origin])
+            predictions=np.asarray(model_fit.forecast(steps=horizon)).ravel()
+        else:
+            predictions=np.asarray(FAST_FORECASTERS[backend](original_price[:origin],differencing_order,steps=horizon)).ravel()
+        actual=values[origin:origin+horizon]
+        errors[i,:len(actual)]=predictions[:len(actual)]-actual
+    return errors
+
+@timed('compute')
+def walk_forward(original_price,differencing_order,ticker=None,backend='arima',n_origins=20,horizon=30,step=5):
+    """Rolling-origin evaluation with origins every `step` bars, the last one leaving a full horizon.
+
+    The ARIMA backends are fitted once at the earliest origin and advanced with extend(), which costs
+    about one fit in total; the NumPy forecasters are cheap enough to refit at every origin.
+    Returns (per-horizon error summary, errors DataFrame of origins x horizon).
+    """
+    # Every origin keeps at least half the series for fitting and a full horizon to score.
+    if len(original_price)<2*horizon:
+        raise ValueError(f"Walk-forward evaluation needs at least {2*horizon} bars for a {horizon}-bar horizon, "
+                         f"got {len(original_price)}")
+    last_origin=len(original_price)-horizon
+    first_origin=max(last_origin-(n_origins-1)*step,len(original_price)//2)
+    origins=list(range(first_origin,last_origin+1,step))
+    errors=_walk_forward_errors(original_price,differencing_order,ticker,backend,origins,horizon)
+    errors=pd.DataFrame(errors,index=pd.Index(origins,name='Origin'),columns=pd.RangeIndex(1,horizon+1,name='Horizon'))
+    absolute=errors.abs()
+    summary=pd.DataFrame({
+        'RMSE':np.sqrt((errors**2).mean()),
+        'MAE':absolute.mean(),
+        'Bias':errors.mean(),
+        'P5 |Error|':absolute.quantile(0.05),
+        'Median |Error|':absolute.median(),
+        'P95 |Error|':absolute.quantile(0.95),
+        'Origins':errors.count(),
+    })
+    return summary,errors
+
+def compare_backends(original_price,differencing_order,backends=BACKENDS):
+    """Scores every backend on the same 30-day holdout and reports RMSE and fit time."""
+    rows=[]
+    for backend in backends:
+        start=time.perf_counter()
+        rmse=evaluate_model(original_price,differencing_order,backend=backend)
+        rows.append({'Backend':backend,'RMSE':rmse,'Fit Time (s)':round(time.perf_counter()-start,3)})
+    return pd.DataFrame(rows).set_index('Backend')
+
+def scaling(close_price,ticker=None):
+    """Standardizes the series. With a ticker, the scaler from an earlier run is reused while the
+    series only grew since, so previously scaled values (and the cached fits on them) stay valid."""
+    values=np.array(close_price).reshape(-1,1)
+    scaler=load_scaler(ticker,values) if ticker else None
+    if scaler is None:
+        scaler=StandardScaler().fit(values)
+        if ticker:
+            save_scaler(ticker,values,scaler)
+    scaled_data=scaler.transform(values)
     return scaled_data, scaler
 
-def get_forecast(original_price,differencing_order):
-    predictions=fit_model(original_price,differencing_order)
+def get_forecast(original_price,differencing_order,ticker=None,backend='arima'):
+    predictions=fit_model(original_price,differencing_order,ticker,backend)
     start_date=datetime.now().strftime('%Y-%m-%d')
     end_date=(datetime.now()+timedelta(days=29)).strftime('%Y-%m-%d')
     forecast_index=pd.date_range(start=start_date,end=end_date,freq='D')
@@ -63,4 +233,33 @@ def get_forecast(original_price,differencing_order):
 
 def inverse_scaling(scaler,scaled_data):
     close_price=scaler.inverse_transform(np.array(scaled_data).reshape(-1,1))
-    return close_price
\ No newline at end of file
+    return close_price
+
+def model_order(differencing_order,ticker=None,backend='arima'):
+    """The (p,d,q) an ARIMA backend used, for reporting; None for the NumPy forecasters."""
+    if backend=='arima':
+        return (30,differencing_order,30)
+    if backend=='arima-auto' and ticker:
+        return load_best_order(ticker,'aic')
+    return None
+
+def forecast_prices(rolling_price,ticker=None,backend='arima'):
+    """The whole Stock_Prediction pipeline on a smoothed price series.
+
+    Returns (30-day forecast in price units, holdout RMSE on the scaled series, model metadata).
+    """
+    start=time.perf_counter()
+    differencing_order=get_differencing_order(rolling_price)
+    scaled_data,scaler=scaling(rolling_price,ticker)
+    rmse=evaluate_model(scaled_data,differencing_order,ticker,backend)
+    forecast=get_forecast(scaled_data,differencing_order,ticker,backend)
+    forecast['Close']=inverse_scaling(scaler,forecast['Close'])
+    order=model_order(differencing_order,ticker,backend)
+    metadata={
+        'backend':backend,
+        'differencing_order':differencing_order,
+        'order':list(order) if order else None,
+        'train_bars':len(rolling_price),
+        'fit_seconds':round(time.perf_counter()-start,3),
+    }
+    return forecast,rmse,metadata
@@ -1,10 +1,15 @@
 import plotly.graph_objects as go
 import dateutil
-import pandas_ta as pta
 import datetime
-import numpy as np
+import pandas as pd
 import plotly.express as px
+from pages.utils.return_engine import normalize, daily_return
+from pages.utils.capm_engine import capm_regression
+from pages.utils.indicators import get_indicators
+from pages.utils.downsample import DEFAULT_MAX_POINTS, downsample_line, downsample_ohlc
+from pages.utils.instrumentation import timed
 
+@timed('render')
 def interactive_plot(df):
     fig=px.line()
     for i in df.columns[1:]:
@@ -13,25 +18,11 @@ def interactive_plot(df):
         y=1.02, xanchor='right', x=1,))
     return fig
 
-def normalize(df_2):
-    df=df_2.copy()
-    for i in df.columns[1:]:
-        df[i]=df[i]/df[i][0]
-    return df
-
-def daily_return(df):
-    df_daily_return=df.copy()
-    for i in df.columns[1:]:
-        for j in range(1,len(df)):
-            df_daily_return[i][j]=((df[i][j]-df[i][j-1])/df[i][j-1])*100
-        df_daily_return[i][0]=0
-    return df_daily_return
-
 def calculate_beta(stocks_daily_return,stock):
-    rm=stocks_daily_return['sp500'].mean()*252
-    b,a=np.polyfit(stocks_daily_return['sp500'],stocks_daily_return[stock],1)
-    return b,a
+    capm_df=capm_regression(stocks_daily_return[[stock]],stocks_daily_return['sp500'])
+    return capm_df.loc[stock,'Beta'],capm_df.loc[stock,'Alpha']
 
+@timed('render')
 def plotly_table(dataframe):
     headerColor = 'grey'
     rowEvenColor = '#f8fafd'
@@ -54,38 +45,54 @@ def plotly_table(dataframe):
     fig.update_layout(height=400, margin=dict(l=0, r=0, t=0, b=0))
     return fig
 
-def filter_data(dataframe,num_period):
-    if num_period=='1mo':
-        date=dataframe.index[-1]+dateutil.relativedelta.relativedelta(months=-1)
-    elif num_period=='5d':
-        date=dataframe.index[-1]+dateutil.relativedelta.relativedelta(days=-5)
-    elif num_period=='6mo':
-        date=dataframe.index[-1]+dateutil.relativedelta.relativedelta(months=-6)
-    elif num_period=='1y':
-        date=dataframe.index[-1]+dateutil.relativedelta.relativedelta(years=-1)
-    elif num_period=='5y':
-        date=dataframe.index[-1]+dateutil.relativedelta.relativedelta(years=-5)
+PERIOD_OFFSETS={
+    '5d':dateutil.relativedelta.relativedelta(days=-5),
+    '1mo':dateutil.relativedelta.relativedelta(months=-1),
+    '6mo':dateutil.relativedelta.relativedelta(months=-6),
+    '1y':dateutil.relativedelta.relativedelta(years=-1),
+    '5y':dateutil.relativedelta.relativedelta(years=-5),
+}
+
+def period_window(dataframe,num_period):
+    """Returns the rows after the period's start date as a positional slice of the sorted DatetimeIndex.
+
+    The start row is found with a binary search, so the cost does not grow with the length of the history.
+    """
+    if dataframe.empty:
+        return dataframe
+    last=dataframe.index[-1]
+    if num_period in PERIOD_OFFSETS:
+        date=last+PERIOD_OFFSETS[num_period]
     elif num_period=='ytd':
-        date=datetime.datetime(dataframe.index[-1].year,1,1).strftime('%Y-%m-%d')
+        date=pd.Timestamp(datetime.datetime(last.year,1,1),tz=last.tz)
     else:
-        date=dataframe.index[0]
+        return dataframe
+    start=dataframe.index.searchsorted(date,side='right')
+    return dataframe.iloc[start:]
+
+def filter_data(dataframe,num_period):
+    return period_window(dataframe,num_period).reset_index()
 
-    return dataframe.reset_index()[dataframe.reset_index()['Date']>date]
+def line_xy(x,y,max_points):
+    """x/y arguments for a line trace, downsampled with LTTB when there are more than max_points."""
+    x,y=downsample_line(x,y,max_points)
+    return dict(x=x,y=y)
 
-def close_chart(dataframe,num_period=False):
+@timed('render')
+def close_chart(dataframe,num_period=False,max_points=DEFAULT_MAX_POINTS):
     if num_period:
-        dataframe=filter_data(dataframe,num_period)
+        dataframe=period_window(dataframe,num_period)
     fig=go.Figure()
-    fig.add_trace(go.Scatter(x=dataframe['Date'],y=dataframe['Open'],
+    fig.add_trace(go.Scatter(**line_xy(dataframe.index,dataframe['Open'],max_points),
                              mode='lines',
                              name='Open',line=dict(width=2,color='#5ab7ff')))
-    fig.add_trace(go.Scatter(x=dataframe['Date'],y=dataframe['Close'],
+    fig.add_trace(go.Scatter(**line_xy(dataframe.index,dataframe['Close'],max_points),
                              mode='lines',
                              name='Close',line=dict(width=2,color='black')))
-    fig.add_trace(go.Scatter(x=dataframe['Date'],y=dataframe['High'],
+    fig.add_trace(go.Scatter(**line_xy(dataframe.index,dataframe['High'],max_points),
                              mode='lines',
                              name='High',line=dict(width=2,color='#0078ff')))
-    fig.add_trace(go.Scatter(x=dataframe['Date'],y=dataframe['Low'],
+    fig.add_trace(go.Scatter(**line_xy(dataframe.index,dataframe['Low'],max_points),
                              mode='lines',
                              name='Low',line=dict(width=2,color='red')))
     fig.update_xaxes(rangeslider_visible=True)
@@ -95,29 +102,30 @@ def close_chart(dataframe,num_period=False):
     ))
     return fig
 
-def candlestick(dataframe,num_period):
-    dataframe=filter_data(dataframe,num_period)
+@timed('render')
+def candlestick(dataframe,num_period,max_points=DEFAULT_MAX_POINTS):
+    dataframe=downsample_ohlc(period_window(dataframe,num_period),max_points)
     fig=go.Figure()
-    fig.add_trace(go.Candlestick(x=dataframe['Date'],
+    fig.add_trace(go.Candlestick(x=dataframe.index,
                                  open=dataframe['Open'],high=dataframe['High'],
                                  low=dataframe['Low'],close=dataframe['Close']))
     fig.update_layout(showlegend=False,height=500,margin=dict(l=0,r=20,t=20,b=0), plot_bgcolor='white',paper_bgcolor='whitesmoke')
     return fig
 
-def RSI(dataframe,num_period):
-    dataframe['RSI']=pta.rsi(dataframe['Close'])
-    dataframe=filter_data(dataframe,num_period)
+@timed('render')
+def RSI(dataframe,num_period,ticker=None):
+    dataframe=period_window(get_indicators(dataframe,ticker),num_period)
     fig=go.Figure()
     fig.add_trace(go.Scatter(
-        x=dataframe['Date'],
+        x=dataframe.index,
         y=dataframe.RSI, name='RSI',marker_color='orange',line=dict(width=2,color='orange'),
     ))
     fig.add_trace(go.Scatter(
-        x=dataframe['Date'],
+        x=dataframe.index,
         y=[70]*len(dataframe),name='Overbrought', marker_color='red',line=dict(width=2,color='red',dash='dash'),
     ))
     fig.add_trace(go.Scatter(
-        x=dataframe['Date'],
+        x=dataframe.index,
         y=[30]*len(dataframe),fill='tonexty',name='Oversold', marker_color='#79da84',line=dict(width=2,color='#79da84',dash='dash'),
     ))
     fig.update_layout(yaxis_range=[0,100],
@@ -130,24 +138,25 @@ def RSI(dataframe,num_period):
     )
     return fig
 
-def Moving_average(dataframe,num_period):
-    dataframe['SMA_50']=pta.sma(dataframe['Close'],50)
-    dataframe=filter_data(dataframe,num_period)
+@timed('render')
+def Moving_average(dataframe,num_period,ticker=None,max_points=DEFAULT_MAX_POINTS):
+    sma=period_window(get_indicators(dataframe,ticker),num_period)['SMA_50']
+    dataframe=period_window(dataframe,num_period)
     fig=go.Figure()
 
-    fig.add_trace(go.Scatter(x=dataframe['Date'],y=dataframe['Open'],
+    fig.add_trace(go.Scatter(**line_xy(dataframe.index,dataframe['Open'],max_points),
                              mode='lines',
                              name='Open',line=dict(width=2,color='#5ab7ff')))
-    fig.add_trace(go.Scatter(x=dataframe['Date'],y=dataframe['Close'],
+    fig.add_trace(go.Scatter(**line_xy(dataframe.index,dataframe['Close'],max_points),
                              mode='lines',
                              name='Close',line=dict(width=2,color='black')))
-    fig.add_trace(go.Scatter(x=dataframe['Date'],y=dataframe['High'],
+    fig.add_trace(go.Scatter(**line_xy(dataframe.index,dataframe['High'],max_points),
                              mode='lines',
                              name='High',line=dict(width=2,color='#0078ff')))
-    fig.add_trace(go.Scatter(x=dataframe['Date'],y=dataframe['Low'],
+    fig.add_trace(go.Scatter(**line_xy(dataframe.index,dataframe['Low'],max_points),
                              mode='lines',
                              name='Low',line=dict(width=2,color='red')))
-    fig.add_trace(go.Scatter(x=dataframe['Date'],y=dataframe['SMA_50'],
+    fig.add_trace(go.Scatter(**line_xy(dataframe.index,sma,max_points),
                              mode='lines',
                              name='SMA 50',line=dict(width=2,color='purple')))
     
@@ -159,22 +168,17 @@ def Moving_average(dataframe,num_period):
 
     return fig
 
-def MACD(dataframe,num_period):
-    macd=pta.macd(dataframe['Close']).iloc[:,0]
-    macd_signal=pta.macd(dataframe['Close']).iloc[:,1]
-    macd_hist=pta.macd(dataframe['Close']).iloc[:,2]
-    dataframe['MACD']=macd
-    dataframe['MACD Signal']=macd_signal
-    dataframe['MACD Hist']=macd_hist
-    dataframe=filter_data(dataframe,num_period)
+@timed('render')
+def MACD(dataframe,num_period,ticker=None):
+    dataframe=period_window(get_indicators(dataframe,ticker),num_period)
     fig=go.Figure()
-    fig.add_trace(go.Scatter(x=dataframe['Date'],y=dataframe['MACD'],
-                             name='RSI',marker_color='orange',line=dict(width=2,color='orange'),
+    fig.add_trace(go.Scatter(x=dataframe.index,y=dataframe['MACD'],
+                             name='MACD',marker_color='orange',line=dict(width=2,color='orange'),
     ))
-    fig.add_trace(go.Scatter(x=dataframe['Date'],y=dataframe['MACD Signal'],
-                             name='Overbought',marker_color='red',line=dict(width=2,color='red',dash='dash'),
+    fig.add_trace(go.Scatter(x=dataframe.index,y=dataframe['MACD Signal'],
+                             name='MACD Signal',marker_color='red',line=dict(width=2,color='red',dash='dash'),
     ))
-    c=['red' if cl <0 else 'green' for cl in macd_hist]
+    c=['red' if cl <0 else 'green' for cl in dataframe['MACD Hist']]
 
     fig.update_layout(
         height=200,plot_bgcolor='white',paper_bgcolor='whitesmoke',margin=dict(l=0,r=0,t=0,b=0),legend=dict(orientation='h',
@@ -186,6 +190,7 @@ def MACD(dataframe,num_period):
     )
     return fig
 
+@timed('render')
 def Moving_average_forecast(forecast):
     fig=go.Figure()
     fig.add_trace(go.Scatter(x=forecast.index[:-30],y=forecast['Close'].iloc[:-30],
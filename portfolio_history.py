@@ -0,0 +1,137 @@
+import threading
+import numpy as np
+import pandas as pd
+from cachetools import LRUCache
+from pages.utils.price_store import get_prices
+from pages.utils.series_align import align_series
+from pages.utils.instrumentation import timed
+
+_cache = LRUCache(maxsize=256)
+_cache_lock = threading.Lock()
+
+def _trade_deltas(transactions, dates, tickers):
+    """Scatters each trade's shares and cost onto the first price date on/after its purchase date.
+
+    Returns (shares, cost, leftover) where shares/cost are (dates x tickers) matrices of changes and
+    leftover holds the trades dated after the last price date, which apply once that day arrives.
+    """
+    shares = np.zeros((len(dates), len(tickers)))
+    cost = np.zeros((len(dates), len(tickers)))
+    if transactions.empty:
+        return shares, cost, transactions
+    # Trades in tickers without prices are left out of the curve.
+    transactions = transactions[transactions['ticker'].isin(tickers)]
+    rows = dates.searchsorted(pd.to_datetime(transactions['purchase_date']).to_numpy(), side='left')
+    cols = pd.Index(tickers).get_indexer(transactions['ticker'])
+    in_range = rows < len(dates)
+    trade_shares = transactions['shares'].to_numpy(dtype=float)
+    trade_cost = trade_shares * transactions['purchase_price'].to_numpy(dtype=float)
+    np.add.at(shares, (rows[in_range], cols[in_range]), trade_shares[in_range])
+    np.add.at(cost, (rows[in_range], cols[in_range]), trade_cost[in_range])
+    return shares, cost, transactions[~in_range]
+
+def _values(shares, cost, prices):
+    """Daily value, cost basis and P&L from position and price matrices in one pass each."""
+    value = np.einsum('ij,ij->i', shares, np.nan_to_num(prices))
+    cost_basis = cost.sum(axis=1)
+    return value, cost_basis
+
+def _frame(dates, value, cost_basis):
+    return pd.DataFrame({'Value': value, 'Cost Basis': cost_basis, 'P&L': value - cost_basis},
+                        index=pd.DatetimeIndex(dates, name='Date'))
+
+def compute_history(transactions, prices):
+    """Full computation: cumulative (dates x tickers) positions times the close-price matrix.
+
+    transactions: ticker, shares, purchase_price, purchase_date (in insertion order).
+    prices: close prices indexed by date with one column per ticker, forward-filled.
+    Returns the state dict used by update_history; state['history'] is the result frame.
+    """
+    tickers = list(prices.columns)
+    dates = prices.index
+    first_trade = pd.to_datetime(transactions['purchase_date']).min()
+    start = dates.searchsorted(first_trade, side='left') if not transactions.empty else len(dates)
+    dates = dates[start:]
+    price_matrix = prices.to_numpy(dtype=float)[start:]
+
+    share_deltas, cost_deltas, pending = _trade_deltas(transactions, dates, tickers)
+    shares = share_deltas.cumsum(axis=0)
+    cost = cost_deltas.cumsum(axis=0)
+    value, cost_basis = _values(shares, cost, price_matrix)
+    return {
+        'tickers': tickers,
+        'dates': dates,
+        'shares': shares,
+        'cost': cost,
+        'n_transactions': len(transactions),
+        'pending': pending,
+        'history': _frame(dates, value, cost_basis),
+    }
+
+def update_history(state, transactions, prices):
+    """Extends a previous result with new price dates and newly appended transactions.
+
+    Falls back to compute_history when the tickers change, transactions were removed, or the
+    previously seen dates are no longer a prefix of the price index.
+    """
+    dates_before = state['dates']
+    n = len(dates_before)
+    start = prices.index.searchsorted(dates_before[0]) if n else 0
+    if (n == 0 or list(prices.columns) != state['tickers'] or len(transactions) < state['n_transactions']
+            or start + n > len(prices.index) or prices.index[start + n - 1] != dates_before[-1]):
+        return compute_history(transactions, prices)
+
+    dates = prices.index[start:]
+    price_matrix = prices.to_numpy(dtype=float)[start:]
+    new_transactions = transactions.iloc[state['n_transactions']:]
+
+    shares = np.vstack([state['shares'], np.zeros((len(dates) - n, len(state['tickers'])))])
+    cost = np.vstack([state['cost'], np.zeros((len(dates) - n, len(state['tickers'])))])
+    # Rows past the old end start from the last known position.
+    shares[n:] = state['shares'][-1]
+    cost[n:] = state['cost'][-1]
+
+    # Backdated trades before the first tracked date would shift the start, so recompute.
+    trades = pd.concat([state['pending'], new_transactions])
+    if not trades.empty and pd.to_datetime(trades['purchase_date']).min() < dates[0]:
+        return compute_history(transactions, prices)
+    share_deltas, cost_deltas, pending = _trade_deltas(trades, dates, state['tickers'])
+    shares += share_deltas.cumsum(axis=0)
+    cost += cost_deltas.cumsum(axis=0)
+
+    # Only rows from the first changed one onwards need new values; the last known bar is
+    # always redone because price_store refreshes it while the day is still trading.
+    changed = np.flatnonzero(share_deltas.any(axis=1))
+    first = min(changed[0] if len(changed) else n, n - 1)
+    value, cost_basis = _values(shares[first:], cost[first:], price_matrix[first:])
+    history = pd.concat([state['history'].iloc[:first], _frame(dates[first:], value, cost_basis)])
+    return {
+        'tickers': state['tickers'],
+        'dates': dates,
+        'shares': shares,
+        'cost': cost,
+        'n_transactions': len(transactions),
+        'pending': pending,
+        'history': history,
+    }
+
+def close_matrix(tickers, start):
+    """Forward-filled close prices from `start`, one column per ticker, on the union of their trading days."""
+    closes = []
+    for ticker in tickers:
+        prices = get_prices(ticker, start=start)
+        if not prices.empty and 'Close' in prices:
+            closes.append(prices['Close'].rename(ticker))
+    if not closes:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name='Date'))
+    return align_series(*closes, calendar='union', fill_policy='keep').ffill()
+
+@timed('compute')
+def portfolio_history(key, transactions, prices):
+    """Daily Value / Cost Basis / P&L frame, updated incrementally from the last call for `key`."""
+    with _cache_lock:
+        state = _cache.get(key)
+    state = compute_history(transactions, prices) if state is None else update_history(state, transactions, prices)
+    with _cache_lock:
+        _cache[key] = state
+    return state['history']
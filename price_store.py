@@ -0,0 +1,103 @@
+import os
+import time
+import logging
+import yfinance as yf
+import pandas as pd
+from pages.utils.instrumentation import timed
+from pages.utils.file_store import ticker_key, atomic_path
+
+STORE_DIR = os.path.join("cache", "prices")
+REFRESH_SECONDS = 15 * 60
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+# Relative change in an already stored close that means the history was re-adjusted.
+ADJUSTMENT_TOLERANCE = 1e-6
+
+logger = logging.getLogger(__name__)
+
+def _store_path(ticker, interval):
+    """Returns the parquet file used to store one ticker at one interval."""
+    return os.path.join(STORE_DIR, f"{ticker_key(ticker)}_{interval}.parquet")
+
+def _normalize(history):
+    """Keeps the OHLCV columns and drops the timezone so stored bars match yf.download output."""
+    history = history[[c for c in OHLCV_COLUMNS if c in history.columns]]
+    if history.index.tz is not None:
+        history.index = history.index.tz_localize(None)
+    history.index.name = 'Date'
+    return history
+
+@timed('fetch')
+def _fetch(ticker, interval, start=None):
+    """Downloads bars from Yahoo, either the full history or everything since `start`."""
+    ticker_ = yf.Ticker(ticker)
+    if start is None:
+        history = ticker_.history(period='max', interval=interval)
+    else:
+        history = ticker_.history(start=start, interval=interval)
+    return _normalize(history)
+
+def load_prices(ticker, interval='1d'):
+    """Reads the stored bars for a ticker, or an empty frame if nothing is stored yet."""
+    path = _store_path(ticker, interval)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=OHLCV_COLUMNS)
+    return pd.read_parquet(path)
+
+def save_prices(ticker, prices, interval='1d'):
+    """Writes the bars atomically so concurrent sessions never read a half-written file."""
+    with atomic_path(_store_path(ticker, interval)) as tmp_path:
+        prices.to_parquet(tmp_path)
+
+def is_stale(ticker, interval='1d'):
+    """True when the stored file is missing or older than REFRESH_SECONDS."""
+    path = _store_path(ticker, interval)
+    if not os.path.exists(path):
+        return True
+    return time.time() - os.path.getmtime(path) > REFRESH_SECONDS
+
+def _history_adjusted(stored, new_bars):
+    """True when the re-fetched copy of the last complete stored bar has a different close."""
+    check_date = stored.index[-2]
+    if check_date not in new_bars.index:
+        return False
+    stored_close = stored['Close'].iloc[-2]
+    return abs(new_bars.loc[check_date, 'Close'] - stored_close) > ADJUSTMENT_TOLERANCE * abs(stored_close)
+
+def update_prices(ticker, interval='1d'):
+    """Fetches only the bars missing since the last stored date and merges them into the store."""
+    stored = load_prices(ticker, interval)
+    if len(stored) < 2:
+        prices = _fetch(ticker, interval)
+    else:
+        # Re-fetch the last two stored bars: the last may have been a partial (intraday) bar, and the
+        # one before it is complete, so a different close there means Yahoo re-adjusted the history.
+        new_bars = _fetch(ticker, interval, start=stored.index[-2].strftime('%Y-%m-%d'))
+        if new_bars.empty:
+            prices = stored
+        elif _history_adjusted(stored, new_bars):
+            # A split or dividend changed the adjusted closes; the stored bars are on the old basis.
+            prices = _fetch(ticker, interval)
+        else:
+            prices = pd.concat([stored[stored.index < new_bars.index[0]], new_bars])
+            prices = prices[~prices.index.duplicated(keep='last')]
+    if not prices.empty:
+        save_prices(ticker, prices, interval)
+    return prices
+
+def get_prices(ticker, start=None, end=None, interval='1d'):
+    """Returns OHLCV bars for a ticker from the local store, topping it up from Yahoo when stale."""
+    if is_stale(ticker, interval):
+        try:
+            prices = update_prices(ticker, interval)
+        except Exception:
+            # A failed top-up (network error, Yahoo rate limit) should not hide the bars already stored.
+            prices = load_prices(ticker, interval)
+            if prices.empty:
+                raise
+            logger.warning("Could not update %s %s prices; serving the stored bars", ticker, interval, exc_info=True)
+    else:
+        prices = load_prices(ticker, interval)
+    if start is not None or end is not None:
+        prices = prices.loc[pd.Timestamp(start) if start is not None else None:
+                            pd.Timestamp(end) if end is not None else None]
+    return prices
@@ -0,0 +1,54 @@
+import threading
+import yfinance as yf
+import pandas as pd
+from cachetools import TTLCache
+from pages.utils.instrumentation import timed
+
+QUOTE_TTL_SECONDS = 60
+
+# Shared by every Streamlit session in this process.
+_quote_cache = TTLCache(maxsize=2048, ttl=QUOTE_TTL_SECONDS)
+_cache_lock = threading.Lock()
+
+@timed('fetch')
+def _fetch_quotes(tickers):
+    """Downloads recent closes for all tickers in one batched request."""
+    closes = yf.download(tickers, period='5d', progress=False)['Close']
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame(tickers[0])
+    quotes = {}
+    for ticker in tickers:
+        series = closes[ticker].dropna() if ticker in closes.columns else pd.Series(dtype=float)
+        if series.empty:
+            # Cache misses too, so an invalid ticker does not trigger a download on every rerun.
+            quotes[ticker] = None
+            continue
+        quotes[ticker] = {
+            'price': float(series.iloc[-1]),
+            'prev_close': float(series.iloc[-2]) if len(series) > 1 else None,
+        }
+    return quotes
+
+def get_quotes(tickers):
+    """Returns {ticker: {'price', 'prev_close'} or None}, only downloading tickers not cached within the TTL."""
+    tickers = [ticker.upper() for ticker in tickers]
+    with _cache_lock:
+        quotes = {ticker: _quote_cache[ticker] for ticker in tickers if ticker in _quote_cache}
+    missing = [ticker for ticker in dict.fromkeys(tickers) if ticker not in quotes]
+    if missing:
+        quotes.update(refresh_quotes(missing))
+    return quotes
+
+def refresh_quotes(tickers):
+    """Downloads fresh quotes for all tickers, bypassing the TTL, and stores them in the cache."""
+    tickers = list(dict.fromkeys(ticker.upper() for ticker in tickers))
+    fetched = _fetch_quotes(tickers)
+    with _cache_lock:
+        for ticker, quote in fetched.items():
+            _quote_cache[ticker] = quote
+    return fetched
+
+def clear_quotes():
+    """Drops every cached quote."""
+    with _cache_lock:
+        _quote_cache.clear()
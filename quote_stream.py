@@ -0,0 +1,171 @@
+import os
+import time
+import threading
+from abc import ABC, abstractmethod
+from pages.utils.quote_service import refresh_quotes
+from pages.utils.synthetic_data import synthetic_ohlcv
+
+# How often the pages redraw their price widgets from the board.
+REFRESH_SECONDS = 5
+# How often the producer polls its tick source. Yahoo is polled less often to stay within rate limits.
+POLL_SECONDS = {'yahoo': 15, 'simulated': 1}
+# Tickers no page has read for this long are no longer polled.
+SUBSCRIPTION_IDLE_SECONDS = 300
+# Set to 'simulated' to stream synthetic ticks instead of Yahoo quotes (offline runs and tests).
+TICK_SOURCE_ENV = "TRADING_APP_TICK_SOURCE"
+
+class TickSource(ABC):
+    """Where the producer gets prices from. poll() returns {ticker: {'price', 'prev_close'} or None}."""
+
+    @abstractmethod
+    def poll(self, tickers):
+        raise NotImplementedError
+
+class YahooTickSource(TickSource):
+    """Fresh Yahoo quotes for every ticker in one batched request."""
+
+    def poll(self, tickers):
+        return refresh_quotes(tickers)
+
+class SimulatedTickSource(TickSource):
+    """Replays synthetic daily closes, one bar per poll, so streaming can run without network access."""
+
+    def __init__(self, seed=0, years=1):
+        self.seed = seed
+        self.years = years
+        self._closes = {}
+        self._position = {}
+        self._lock = threading.Lock()
+
+    def poll(self, tickers):
+        quotes = {}
+        with self._lock:
+            for ticker in tickers:
+                quotes[ticker] = self._next_quote(ticker)
+        return quotes
+
+    def _next_quote(self, ticker):
+        if ticker not in self._closes:
+            self._closes[ticker] = synthetic_ohlcv(ticker, self.years, self.seed)['Close'].to_numpy()
+            self._position[ticker] = 1
+        closes = self._closes[ticker]
+        i = self._position[ticker] % len(closes) or 1
+        self._position[ticker] = i + 1
+        return {'price': float(closes[i]), 'prev_close': float(closes[i - 1])}
+
+class QuoteBoard:
+    """Latest quote per ticker, shared by every session in the process.
+
+    The producer thread keeps it current; pages read from it and only write when seeding a new ticker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._quotes = {}
+        self._last_read = {}
+        self.updated_at = None
+
+    def update(self, quotes):
+        with self._lock:
+            self._quotes.update(quotes)
+            self.updated_at = time.time()
+
+    def subscribe(self, tickers):
+        """Marks tickers as wanted and returns the ones the board has no quote for yet."""
+        now = time.time()
+        with self._lock:
+            for ticker in tickers:
+                self._last_read[ticker.upper()] = now
+            return [ticker.upper() for ticker in tickers if ticker.upper() not in self._quotes]
+
+    def get(self, tickers):
+        """Same shape as quote_service.get_quotes; tickers without a quote yet map to None."""
+        now = time.time()
+        with self._lock:
+            quotes = {}
+            for ticker in tickers:
+                ticker = ticker.upper()
+                self._last_read[ticker] = now
+                quotes[ticker] = self._quotes.get(ticker)
+            return quotes
+
+    def active_tickers(self, max_idle=SUBSCRIPTION_IDLE_SECONDS):
+        """Tickers read within max_idle seconds; older subscriptions are dropped."""
+        cutoff = time.time() - max_idle
+        with self._lock:
+            for ticker in [ticker for ticker, last_read in self._last_read.items() if last_read < cutoff]:
+                del self._last_read[ticker]
+                self._quotes.pop(ticker, None)
+            return sorted(self._last_read)
+
+class QuoteProducer:
+    """Polls the tick source for the board's active tickers on a daemon thread."""
+
+    def __init__(self, board, source, interval):
+        self.board = board
+        self.source = source
+        self.interval = interval
+        self.errors = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def step(self):
+        """One poll of every active ticker; tests call this directly instead of starting the thread."""
+        tickers = self.board.active_tickers()
+        if tickers:
+            self.board.update(self.source.poll(tickers))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.step()
+            except Exception:
+                # Keep the last good quotes on the board and try again next interval.
+                self.errors += 1
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="quote-producer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+board = QuoteBoard()
+_producer = None
+_producer_lock = threading.Lock()
+
+def start_streaming(source=None, interval=None):
+    """Starts the process-wide producer on first call and returns it; later calls return the same one."""
+    global _producer
+    with _producer_lock:
+        if _producer is None:
+            source_name = os.environ.get(TICK_SOURCE_ENV, 'yahoo')
+            if source is None:
+                source = SimulatedTickSource() if source_name == 'simulated' else YahooTickSource()
+            _producer = QuoteProducer(board, source, interval or POLL_SECONDS.get(source_name, POLL_SECONDS['yahoo']))
+            _producer.start()
+        return _producer
+
+def stop_streaming():
+    """Stops the process-wide producer, so the next start_streaming() can use a different source."""
+    global _producer
+    with _producer_lock:
+        if _producer is not None:
+            _producer.stop()
+            _producer = None
+
+def stream_quotes(tickers):
+    """Quotes for the price widgets: registers the tickers with the producer and reads the board.
+
+    Only tickers the board has never seen are fetched here, once; every later refresh is a board read.
+    """
+    producer = start_streaming()
+    missing = board.subscribe(tickers)
+    if missing:
+        board.update(producer.source.poll(missing))
+    return board.get(tickers)
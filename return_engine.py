@@ -0,0 +1,42 @@
+import numpy as np
+from pages.utils.instrumentation import timed
+
+def simple_returns(prices):
+    """Simple returns for a 1-D series or 2-D (rows x stocks) price array, with the first row set to 0."""
+    prices = np.asarray(prices, dtype=float)
+    returns = np.zeros_like(prices)
+    returns[1:] = np.diff(prices, axis=0) / prices[:-1]
+    return returns
+
+def log_returns(prices):
+    """Log returns for a 1-D series or 2-D (rows x stocks) price array, with the first row set to 0."""
+    prices = np.asarray(prices, dtype=float)
+    returns = np.zeros_like(prices)
+    returns[1:] = np.diff(np.log(prices), axis=0)
+    return returns
+
+def _price_columns(df):
+    # The first column of a CAPM price frame is 'Date'; every other column is a price series.
+    return df.columns[1:]
+
+@timed('compute')
+def normalize(df_2):
+    """Divides every price column by its first value so all series start at 1."""
+    df = df_2.copy()
+    columns = _price_columns(df)
+    prices = df[columns].to_numpy(dtype=float)
+    df[columns] = prices / prices[0]
+    return df
+
+@timed('compute')
+def daily_return(df, kind='simple'):
+    """Daily returns in percent for every price column in one pass; the 'Date' column is kept as is."""
+    df_daily_return = df.copy()
+    columns = _price_columns(df)
+    prices = df[columns].to_numpy(dtype=float)
+    if kind == 'log':
+        returns = log_returns(prices)
+    else:
+        returns = simple_returns(prices)
+    df_daily_return[columns] = returns * 100
+    return df_daily_return
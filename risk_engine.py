@@ -0,0 +1,106 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from scipy.stats import norm
+from pages.utils.instrumentation import timed
+
+TRADING_DAYS = 252
+DEFAULT_PATHS = 100_000
+DEFAULT_SEED = 42
+# Paths simulated together; peak memory per worker is about CHUNK_SIZE x positions x 8 bytes.
+CHUNK_SIZE = 5_000
+# Below this many paths the process pool costs more than it saves.
+PARALLEL_MIN_PATHS = 20_000
+# Path points per horizon (monthly for a 1-year horizon). Gaussian log-return increments add up
+# exactly, so the horizon distribution does not depend on this; it only sets the path resolution.
+DEFAULT_STEPS = 12
+
+def covariance_matrix(returns):
+    """Sample covariance of daily returns (rows x tickers) as a DataFrame; rows with gaps are dropped."""
+    return returns.dropna().cov()
+
+def _factor(cov):
+    """A matrix L with L @ L.T == cov, falling back to an eigen-decomposition when cov is singular."""
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        eigenvalues, eigenvectors = np.linalg.eigh(cov)
+        return eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))
+
+def parametric_var(position_values, mean, cov, confidence=0.95, horizon_days=TRADING_DAYS):
+    """Gaussian (variance-covariance) VaR and CVaR of the portfolio over the horizon, in dollars.
+
+    mean and cov are the daily mean vector and covariance matrix of the positions' returns.
+    """
+    values = np.asarray(position_values, dtype=float)
+    pnl_mean = values @ np.asarray(mean, dtype=float) * horizon_days
+    pnl_std = np.sqrt(values @ np.asarray(cov, dtype=float) @ values * horizon_days)
+    z = norm.ppf(1 - confidence)
+    var = -(pnl_mean + z * pnl_std)
+    cvar = -(pnl_mean - pnl_std * norm.pdf(z) / (1 - confidence))
+    return var, cvar
+
+def _simulate_chunk(args):
+    """Terminal portfolio values for one chunk of paths, stepping through time to bound memory."""
+    position_values, drift, factor, steps, n_paths, seed_sequence = args
+    rng = np.random.default_rng(seed_sequence)
+    cumulative = np.zeros((n_paths, len(position_values)))
+    for _ in range(steps):
+        cumulative += drift + rng.standard_normal((n_paths, len(position_values))) @ factor.T
+    return np.exp(cumulative) @ position_values
+
+@timed('compute')
+def simulate_terminal_values(position_values, mean, cov, horizon_days=TRADING_DAYS, n_paths=DEFAULT_PATHS,
+                             seed=DEFAULT_SEED, steps=DEFAULT_STEPS, chunk_size=CHUNK_SIZE, max_workers=None):
+    """Simulates correlated log-return paths for every position, with the daily mean and covariance
+    scaled to `steps` equal time steps, and returns the portfolio value at the horizon for each path.
+
+    Each chunk gets its own child of SeedSequence(seed), so the result for a given seed and
+    chunk_size is the same whether the chunks run in-process or across a process pool.
+    """
+    values = np.asarray(position_values, dtype=float)
+    cov = np.asarray(cov, dtype=float)
+    steps = max(1, min(steps, horizon_days))
+    step_days = horizon_days / steps
+    # Log-return drift, so the simulated simple returns keep the historical mean.
+    drift = (np.asarray(mean, dtype=float) - 0.5 * np.diag(cov)) * step_days
+    factor = _factor(cov * step_days)
+    sizes = [min(chunk_size, n_paths - start) for start in range(0, n_paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(values, drift, factor, steps, size, child) for size, child in zip(sizes, seeds)]
+
+    if n_paths < PARALLEL_MIN_PATHS or len(tasks) == 1 or max_workers == 1:
+        return np.concatenate([_simulate_chunk(task) for task in tasks])
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+        return np.concatenate(list(pool.map(_simulate_chunk, tasks)))
+
+def simulated_var(terminal_values, initial_value, confidence=0.95):
+    """Historical-style VaR and CVaR (expected loss beyond VaR) of the simulated losses, in dollars."""
+    losses = initial_value - np.asarray(terminal_values, dtype=float)
+    var = np.quantile(losses, confidence)
+    cvar = losses[losses >= var].mean()
+    return var, cvar
+
+def risk_report(position_values, returns, confidence=0.95, horizon_days=TRADING_DAYS, n_paths=DEFAULT_PATHS,
+                seed=DEFAULT_SEED, max_workers=None):
+    """Parametric and Monte Carlo VaR/CVaR for a portfolio.
+
+    position_values: current dollar value per ticker (a Series indexed by ticker).
+    returns: daily simple returns, one column per ticker.
+    Returns (summary DataFrame, simulated terminal values).
+    """
+    returns = returns[position_values.index].dropna()
+    mean = returns.mean().to_numpy()
+    cov = covariance_matrix(returns).to_numpy()
+    initial_value = position_values.sum()
+
+    parametric = parametric_var(position_values, mean, cov, confidence, horizon_days)
+    terminal_values = simulate_terminal_values(position_values, mean, cov, horizon_days, n_paths, seed,
+                                               max_workers=max_workers)
+    simulated = simulated_var(terminal_values, initial_value, confidence)
+    summary = pd.DataFrame({'VaR': [parametric[0], simulated[0]], 'CVaR': [parametric[1], simulated[1]]},
+                           index=['Parametric', 'Monte Carlo'])
+    summary['VaR (%)'] = summary['VaR'] / initial_value * 100
+    summary['CVaR (%)'] = summary['CVaR'] / initial_value * 100
+    return summary, terminal_values
@@ -0,0 +1,56 @@
+import pandas as pd
+
+FILL_POLICIES = ('drop', 'ffill', 'keep')
+
+def normalize_daily_index(index):
+    """Maps any date-like index to tz-naive midnight timestamps in the series' own local time.
+
+    Yahoo daily bars carry the exchange timezone (e.g. 2024-01-02 00:00-05:00) while FRED
+    dates are naive; dropping the timezone keeps the local calendar date for both.
+    """
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.normalize()
+
+def _as_frame(obj):
+    frame = obj.to_frame() if isinstance(obj, pd.Series) else obj.copy()
+    frame.index = normalize_daily_index(frame.index)
+    # Keep the last bar if normalizing produced two rows for the same day.
+    return frame[~frame.index.duplicated(keep='last')]
+
+def align_series(*objs, calendar='intersection', fill_policy='drop', fill_limit=None):
+    """Joins any number of Series/DataFrames on one daily calendar.
+
+    calendar: 'intersection' (dates present in every input), 'union' (dates in any input),
+        the name of a column whose non-missing dates define the calendar (e.g. a stock's
+        trading days), or an explicit DatetimeIndex.
+    fill_policy: how to treat dates a series has no value for, such as FRED holidays:
+        'drop' removes those dates, 'ffill' carries the previous value forward (at most
+        `fill_limit` consecutive rows) and then drops what is still missing, 'keep' leaves NaN.
+    Returns a DataFrame indexed by 'Date'.
+    """
+    if fill_policy not in FILL_POLICIES:
+        raise ValueError(f"fill_policy must be one of {FILL_POLICIES}, got {fill_policy!r}")
+    frames = [_as_frame(obj) for obj in objs]
+    combined = pd.concat(frames, axis=1, join='outer').sort_index()
+
+    if isinstance(calendar, pd.DatetimeIndex):
+        dates = normalize_daily_index(calendar)
+    elif calendar == 'union':
+        dates = combined.index
+    elif calendar == 'intersection':
+        dates = frames[0].index
+        for frame in frames[1:]:
+            dates = dates.intersection(frame.index)
+    else:
+        dates = combined.index[combined[calendar].notna().to_numpy()]
+
+    if fill_policy == 'ffill':
+        # Fill before restricting to the calendar, so a value from a non-calendar day can carry over.
+        combined = combined.ffill(limit=fill_limit)
+    aligned = combined.reindex(dates)
+    if fill_policy in ('drop', 'ffill'):
+        aligned = aligned.dropna()
+    aligned.index.name = 'Date'
+    return aligned
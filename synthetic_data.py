@@ -0,0 +1,49 @@
+import zlib
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+def _rng(ticker, seed):
+    # Seed from the ticker name too, so each ticker gets its own but reproducible path.
+    return np.random.default_rng([seed, zlib.crc32(ticker.encode())])
+
+def synthetic_ohlcv(ticker, years=10, seed=0, start='2000-01-03', start_price=100.0,
+                    drift=0.07, volatility=0.25):
+    """Deterministic daily OHLCV bars following a geometric Brownian motion, indexed by business day."""
+    rng = _rng(ticker, seed)
+    n = int(years * TRADING_DAYS)
+    index = pd.bdate_range(start=start, periods=n, name='Date')
+    dt = 1 / TRADING_DAYS
+    log_returns = (drift - 0.5 * volatility ** 2) * dt + volatility * np.sqrt(dt) * rng.standard_normal(n)
+    close = start_price * np.exp(np.cumsum(log_returns))
+    open_ = np.concatenate([[start_price], close[:-1]]) * np.exp(0.002 * rng.standard_normal(n))
+    spread = np.abs(rng.standard_normal(n)) * volatility * np.sqrt(dt) * close
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) + spread,
+        'Low': np.minimum(open_, close) - spread,
+        'Close': close,
+        'Volume': rng.integers(100_000, 10_000_000, n),
+    }, index=index)
+
+def synthetic_tickers(n_tickers):
+    return [f"SYN{i:03d}" for i in range(n_tickers)]
+
+def synthetic_panel(n_tickers=8, years=10, seed=0):
+    """Close prices for `n_tickers` synthetic stocks plus a correlated 'sp500' market column.
+
+    Each stock is beta * market + idiosyncratic noise, so CAPM betas are meaningful.
+    """
+    n = int(years * TRADING_DAYS)
+    market = synthetic_ohlcv('SP500', years, seed, volatility=0.18)['Close']
+    market_returns = np.diff(np.log(market.to_numpy()), prepend=np.log(market.iloc[0]))
+    closes = {}
+    for ticker in synthetic_tickers(n_tickers):
+        rng = _rng(ticker, seed)
+        beta = rng.uniform(0.5, 1.8)
+        noise = 0.2 * np.sqrt(1 / TRADING_DAYS) * rng.standard_normal(n)
+        closes[ticker] = 100 * np.exp(np.cumsum(beta * market_returns + noise))
+    panel = pd.DataFrame(closes, index=market.index)
+    panel['sp500'] = market.to_numpy()
+    return panel